@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Benchmark extract_estimates.py internals.
+
+suite: generate a synthetic corpus (see synth_workbooks.py) and scan it
+with each reader under --profile, one spawned process per reader so each
+gets its own peak RSS. Reports throughput, per-phase latency percentiles,
+peak RSS and any file whose detected format differs from the one it was
+generated as. --json PATH writes the report for later comparison.
+
+compare: print the change in throughput, peak RSS and per-phase p50
+between two suite reports, e.g. from two commits.
+
+grid: compare the Grid store against the original (row, col) -> value dict
+on every non-skip tab. Rows are read once up front so build time and the
+lookup pattern the extractors use (column B scan, GL codes in A1:A199,
+recap T10:Z110) measure store cost only. Retained memory is traced in a
+separate pass that builds each store straight from the XML reader, so row
+tuples and cell values count against the store that keeps them.
+
+Usage:
+    python scripts/bench_extract.py suite [--files N --tabs N --sections N --rows N
+        --tail-rows N --versions N --recap-cols N --seed N] [--readers openpyxl,xml]
+        [--bounded] [--corpus DIR] [--json PATH]
+    python scripts/bench_extract.py compare BASE.json NEW.json
+    python scripts/bench_extract.py grid [file.xlsx ...]
+
+suite generates into a temporary directory unless --corpus names one to
+keep. grid defaults to the first 20 files in historical_estimates/.
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import extract_estimates as ee
+import synth_workbooks
+
+DEFAULT_FILE_COUNT = 20
+
+
+def build_dict_grid(rows):
+    """The original load_grid layout: (row, col) -> value for non-empty cells."""
+    grid = {}
+    for row_idx, row in enumerate(rows, start=1):
+        for col_idx, val in enumerate(row, start=1):
+            if val is not None:
+                grid[(row_idx, col_idx)] = val
+    return grid
+
+
+def build_compact_grid(rows):
+    grid = ee.Grid()
+    for row in rows:
+        grid.add_row(row)
+    return grid.finish()
+
+
+def dict_max_row(grid):
+    return max((r for r, c in grid.keys()), default=0)
+
+
+def dict_lookups(grid, max_row):
+    hits = 0
+    for row in range(1, max_row + 1):
+        if grid.get((row, 2)) is not None:
+            hits += 1
+    for row in range(1, 200):
+        if grid.get((row, 1)) is not None:
+            hits += 1
+    for row in range(10, 111):
+        for col in range(20, 27):
+            if grid.get((row, col)) is not None:
+                hits += 1
+    return hits
+
+
+def compact_lookups(grid, max_row):
+    get = ee.get
+    hits = 0
+    for row in range(1, max_row + 1):
+        if get(grid, row, 2) is not None:
+            hits += 1
+    for row in range(1, 200):
+        if get(grid, row, 1) is not None:
+            hits += 1
+    for row in range(10, 111):
+        for col in range(20, 27):
+            if get(grid, row, col) is not None:
+                hits += 1
+    return hits
+
+
+STORES = {
+    "dict": (build_dict_grid, dict_max_row, dict_lookups),
+    "grid": (build_compact_grid, lambda g: g.max_row, compact_lookups),
+}
+
+
+def measure(rows, store, reread):
+    build, max_row_of, lookups = STORES[store]
+    start = time.perf_counter()
+    grid = build(rows)
+    max_row = max_row_of(grid)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = lookups(grid, max_row)
+    lookup_seconds = time.perf_counter() - start
+
+    # Memory in a separate pass: tracemalloc slows allocation-heavy code
+    del grid
+    tracemalloc.start()
+    grid = build(reread())
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return build_seconds, lookup_seconds, retained, hits
+
+
+def bench_grid(paths):
+    totals = {store: [0.0, 0.0, 0] for store in STORES}
+    tabs = 0
+    for path in paths:
+        try:
+            book = ee.XmlBook(path)
+        except Exception as e:
+            print(f"  skip {os.path.basename(path)}: {e}")
+            continue
+        try:
+            for name in book.sheetnames:
+                if name in ee.SKIP_TABS:
+                    continue
+                rows = list(book.iter_rows(name))
+                tabs += 1
+                hits = set()
+                for store in STORES:
+                    build_s, lookup_s, retained, store_hits = measure(
+                        rows, store, lambda: book.iter_rows(name))
+                    totals[store][0] += build_s
+                    totals[store][1] += lookup_s
+                    totals[store][2] += retained
+                    hits.add(store_hits)
+                if len(hits) > 1:
+                    print(f"  LOOKUP MISMATCH: {os.path.basename(path)} / {name}")
+        finally:
+            book.close()
+
+    print(f"\n--- GRID BENCHMARK ({len(paths)} files, {tabs} tabs) ---")
+    print(f"{'store':8s} {'build s':>10s} {'lookup s':>10s} {'retained MB':>12s}")
+    for store, (build_s, lookup_s, retained) in totals.items():
+        print(f"{store:8s} {build_s:10.3f} {lookup_s:10.3f} {retained / 1e6:12.2f}")
+    base, compact = totals["dict"], totals["grid"]
+    if compact[0] and compact[1] and compact[2]:
+        print(f"grid vs dict: build {base[0] / compact[0]:.1f}x faster, "
+              f"lookup {base[1] / compact[1]:.1f}x faster, "
+              f"{base[2] / compact[2]:.1f}x less memory")
+
+
+def suite_pass(job):
+    """Spawned worker: scan the corpus with one reader, profiling every file."""
+    reader, corpus, bounded = job
+    profiles = []
+    mismatches = []
+    start = time.perf_counter()
+    for path, expected in corpus:
+        result = ee.scan_file(path, os.path.basename(path), reader, bounded, profile=True)
+        profiles.append(result["profile"])
+        if result.get("error") or result.get("format") != expected:
+            mismatches.append(os.path.basename(path))
+    return time.perf_counter() - start, profiles, mismatches
+
+
+def spread(values):
+    values = sorted(values)
+    return {
+        "p50": round(ee.percentile(values, 50), 5),
+        "p90": round(ee.percentile(values, 90), 5),
+        "p99": round(ee.percentile(values, 99), 5),
+        "max": round(values[-1], 5),
+        "total": round(sum(values), 4),
+    }
+
+
+def suite_metrics(seconds, profiles, mismatches):
+    phases = []
+    for profile in profiles:
+        for phase in profile["phases"]:
+            if phase not in phases:
+                phases.append(phase)
+    cells = sum(p["cells"] for p in profiles)
+    return {
+        "files": len(profiles),
+        "seconds": round(seconds, 3),
+        "files_per_sec": round(len(profiles) / seconds, 2),
+        "cells": cells,
+        "cells_per_sec": round(cells / seconds),
+        "peak_rss_mb": max(p["peak_rss_mb"] for p in profiles),
+        "format_mismatches": mismatches,
+        "per_file": spread(p["total"] for p in profiles),
+        "phases": {phase: spread(p["phases"].get(phase, {}).get("seconds", 0.0) for p in profiles)
+                   for phase in phases},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ee.PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(argv):
+    spec = synth_workbooks.spec_from_args(argv)
+    readers = ee.arg_value("--readers", ",".join(ee.READERS)).split(",")
+    bounded = "--bounded" in argv
+    corpus_dir = ee.arg_value("--corpus") or tempfile.mkdtemp(prefix="synth_estimates_")
+
+    start = time.perf_counter()
+    corpus = synth_workbooks.generate_corpus(corpus_dir, spec)
+    print(f"Generated {len(corpus)} workbooks in {time.perf_counter() - start:.1f}s -> {corpus_dir}")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "spec": spec,
+        "bounded": bounded,
+        "readers": {},
+    }
+    try:
+        # A fresh spawned process per reader, so peak RSS is not inherited
+        ctx = multiprocessing.get_context("spawn")
+        for reader in readers:
+            with ctx.Pool(1) as pool:
+                seconds, profiles, mismatches = pool.apply(suite_pass, ((reader, corpus, bounded),))
+            report["readers"][reader] = suite_metrics(seconds, profiles, mismatches)
+    finally:
+        if not ee.arg_value("--corpus"):
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    print(f"\n--- SUITE ({len(corpus)} files, bounded={bounded}) ---")
+    print(f"{'reader':10s} {'files/s':>9s} {'Mcells/s':>9s} {'p50 ms':>8s} {'p99 ms':>8s} "
+          f"{'peak MB':>8s} {'mismatch':>8s}")
+    for reader, m in report["readers"].items():
+        print(f"{reader:10s} {m['files_per_sec']:9.2f} {m['cells_per_sec'] / 1e6:9.3f} "
+              f"{m['per_file']['p50'] * 1e3:8.1f} {m['per_file']['p99'] * 1e3:8.1f} "
+              f"{m['peak_rss_mb']:8.1f} {len(m['format_mismatches']):8d}")
+        for phase, st in m["phases"].items():
+            print(f"  {phase:14s} p50 {st['p50'] * 1e3:8.2f} ms  p99 {st['p99'] * 1e3:8.2f} ms  "
+                  f"total {st['total']:7.2f}s")
+
+    json_path = ee.arg_value("--json")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport: {json_path}")
+
+
+def change(base, new):
+    return f"{(new - base) / base * 100:+.1f}%" if base else "n/a"
+
+
+def bench_compare(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if base["spec"] != new["spec"] or base["bounded"] != new["bounded"]:
+        print("WARNING: reports differ in spec or --bounded; deltas are not like-for-like")
+    print(f"--- {base.get('commit')} -> {new.get('commit')} ---")
+    for reader, n in new["readers"].items():
+        b = base["readers"].get(reader)
+        if not b:
+            print(f"{reader}: not in {base_path}")
+            continue
+        print(f"{reader}: files/s {b['files_per_sec']} -> {n['files_per_sec']} "
+              f"({change(b['files_per_sec'], n['files_per_sec'])}), "
+              f"peak RSS {b['peak_rss_mb']} -> {n['peak_rss_mb']} MB "
+              f"({change(b['peak_rss_mb'], n['peak_rss_mb'])})")
+        for phase, st in n["phases"].items():
+            old = b["phases"].get(phase)
+            if old:
+                print(f"  {phase:14s} p50 {old['p50'] * 1e3:8.2f} -> {st['p50'] * 1e3:8.2f} ms "
+                      f"({change(old['p50'], st['p50'])})")
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else None
+    if mode == "suite":
+        bench_suite(sys.argv)
+    elif mode == "compare" and len(sys.argv) == 4:
+        bench_compare(sys.argv[2], sys.argv[3])
+    elif mode == "grid":
+        paths = [p for p in sys.argv[2:] if p.endswith(".xlsx")]
+        if not paths:
+            files = sorted(f for f in os.listdir(ee.INPUT_DIR) if f.endswith(".xlsx"))
+            paths = [os.path.join(ee.INPUT_DIR, f) for f in files[:DEFAULT_FILE_COUNT]]
+        bench_grid(paths)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
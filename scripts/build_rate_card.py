@@ -4,6 +4,8 @@
 Aggressively normalizes role names to collapse scheduling suffixes,
 date labels, OT/DT/Weekend/Afterhours variants, rate unit variants,
 and typos into base roles. Target: ~50-80 unique base roles.
+
+Pass --jsonl to read scan_results.jsonl lazily instead.
 """
 
 import json
@@ -11,8 +13,11 @@ import math
 import os
 import re
 import statistics
+import sys
 from collections import defaultdict
 
+from scan_results_io import iter_scan_results
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
@@ -26,8 +31,11 @@ def filter_outliers(values, n_sigma=3):
         return values
     return [v for v in values if abs(v - med) <= n_sigma * std]
 SCAN_RESULTS = os.path.join(PROJECT_ROOT, "scan_results.json")
+SCAN_RESULTS_JSONL = os.path.join(PROJECT_ROOT, "scan_results.jsonl")
 OUTPUT = os.path.join(PROJECT_ROOT, "rate_card_master.json")
 
+JSONL = "--jsonl" in sys.argv
+
 
 def detect_flags(name):
     """Detect OT/DT/Weekend/Afterhours flags from role name string."""
@@ -260,9 +268,6 @@ def normalize_role_name(raw_name):
 
 
 def main():
-    with open(SCAN_RESULTS) as f:
-        data = json.load(f)
-
     # Aggregate by normalized base role name
     role_data = defaultdict(lambda: {
         "gl_codes": set(),
@@ -276,7 +281,7 @@ def main():
         "cost_rates": [],
     })
 
-    for result in data["results"]:
+    for result in iter_scan_results(SCAN_RESULTS_JSONL if JSONL else SCAN_RESULTS):
         if result.get("error"):
             continue
         for role in result.get("labor_roles", []):
@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
-"""Build financial_summary.json and section_summary.json from enriched_master_index.json."""
+"""Build financial_summary.json and section_summary.json from enriched_master_index.json.
+
+Pass --jsonl to read enriched_master_index.jsonl lazily instead.
+"""
 
 import json
 import os
 import statistics
+import sys
 from collections import defaultdict
 
+from scan_results_io import iter_enriched
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ENRICHED = os.path.join(PROJECT_ROOT, "enriched_master_index.json")
+ENRICHED_JSONL = os.path.join(PROJECT_ROOT, "enriched_master_index.jsonl")
 FINANCIAL_OUT = os.path.join(PROJECT_ROOT, "financial_summary.json")
 SECTION_OUT = os.path.join(PROJECT_ROOT, "section_summary.json")
 
+JSONL = "--jsonl" in sys.argv
+
 
 def safe_float(val):
     if val is None:
@@ -30,8 +39,10 @@ def build_financial_summary(records):
     by_revenue_segment = defaultdict(lambda: {"event_count": 0, "total_revenue": 0.0})
     by_status = defaultdict(int)
     files_with_recap = 0
+    total_events = 0
 
     for r in records:
+        total_events += 1
         gt = safe_float(r.get("grand_total"))
         if gt is not None and gt > 0:
             grand_totals.append(gt)
@@ -88,7 +99,7 @@ def build_financial_summary(records):
         }
 
     return {
-        "total_events": len(records),
+        "total_events": total_events,
         "total_revenue": round(total_revenue, 2),
         "grand_total_ranges": {
             "min": round(min(grand_totals), 2) if grand_totals else 0,
@@ -146,16 +157,16 @@ def build_section_summary(records):
 
 
 def main():
-    with open(ENRICHED) as f:
-        records = json.load(f)
-
-    print(f"Processing {len(records)} enriched records")
+    # Each summary makes its own pass so --jsonl never holds every record
+    path = ENRICHED_JSONL if JSONL else ENRICHED
+    records = None if JSONL else list(iter_enriched(path))
 
-    financial = build_financial_summary(records)
+    financial = build_financial_summary(records if records is not None else iter_enriched(path))
+    print(f"Processing {financial['total_events']} enriched records")
     with open(FINANCIAL_OUT, "w") as f:
         json.dump(financial, f, indent=2)
 
-    section = build_section_summary(records)
+    section = build_section_summary(records if records is not None else iter_enriched(path))
     with open(SECTION_OUT, "w") as f:
         json.dump(section, f, indent=2)
 
@@ -1,20 +1,140 @@
 #!/usr/bin/env python3
-"""Download estimate spreadsheets from JotForm URLs in the Project List."""
+"""Download estimate spreadsheets from JotForm URLs in the Project List.
 
+Downloads are fingerprinted by SHA-256. When a download is byte-identical
+to one already saved (e.g. a "Recap ..." re-upload), it is stored as a
+hard link to the first copy instead of a second copy of the bytes. Files
+from earlier runs count once the manifest below records their hash.
+
+Files are fetched by --workers N threads (default DEFAULT_WORKERS) sharing
+one pooled requests session. --rate R caps requests per second across all
+hosts with a token bucket (0 = unlimited). Each host also gets at most
+--host-concurrency N requests in flight and --host-rate R requests per
+second; --host-limit HOST=N/R overrides both for one host, and
+HOST_LIMITS holds the standing overrides.
+
+Each file streams to FILENAME.part in CHUNK_SIZE pieces and is renamed
+into place only once its size matches the server's and its zip CRCs check
+out, so an interrupted run never leaves a truncated .xlsx behind. A .part
+left by a dropped connection or a killed run is resumed with an HTTP Range
+request; servers that ignore Range send the whole file again. The resumed
+request carries If-Range with the first response's strong ETag (or its
+Last-Modified), kept in FILENAME.part.json, so a file changed upstream
+since the .part was started comes back whole instead of being spliced
+onto the old bytes. A .part with no validator is downloaded again. An
+existing .xlsx that is not a readable zip is downloaded again.
+
+Every saved file is recorded in OUTPUT_DIR/download_manifest.json:
+{"version": 1, "files": {filename: {"url", "etag", "last_modified",
+"size", "sha256", "fetched_at", "mtime_ns"}}}. Pass --refresh to re-check
+files that already exist: requests carry If-None-Match/If-Modified-Since
+from the manifest, so only files changed upstream are transferred. A file
+already on disk that no download recorded (e.g. from before the manifest)
+gets an entry with its size and hash but no validators, so the first
+--refresh still transfers it in full; after that it has validators like
+any other.
+extract_estimates.py takes a file's hash from the manifest when its size
+and mtime_ns still match instead of reading it again.
+
+Pass --from-parsed to take the URLs from project_list_parsed.json (written
+by parse_project_list.py) instead of reading the Project List workbook
+again; each URL is indexed to its filename and Project List record.
+--newest-first downloads in order of submission_date, newest first.
+
+fake_jotform.py serves fake .xlsx payloads locally and checks this engine
+against them.
+"""
+
+import hashlib
+import json
 import os
+import re
 import sys
+import threading
 import time
-from urllib.parse import unquote
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlsplit
 
 import openpyxl
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROJECT_LIST = os.path.join(PROJECT_ROOT, "DriveShop_Project_List.xlsx")
+PARSED_PROJECT_LIST = os.path.join(PROJECT_ROOT, "project_list_parsed.json")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "historical_estimates")
 
+
+def arg_value(flag, default=None):
+    """Return the value following flag in sys.argv, or default if absent."""
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def arg_values(flag):
+    """Every value following a repeatable flag in sys.argv."""
+    return [sys.argv[i + 1] for i, arg in enumerate(sys.argv[:-1]) if arg == flag]
+
+
 # Pass --test to only download first 5 files
 TEST_MODE = "--test" in sys.argv
+REFRESH = "--refresh" in sys.argv
+FROM_PARSED = "--from-parsed" in sys.argv
+NEWEST_FIRST = "--newest-first" in sys.argv
+SUBMISSION_DATE_FORMATS = ("%b %d, %Y %H:%M", "%Y-%m-%d")  # JotForm export, parsed date
+MANIFEST_NAME = "download_manifest.json"
+MANIFEST_VERSION = 1
+MANIFEST_EVERY = 50  # completed downloads between manifest saves
+
+DEFAULT_WORKERS = 8
+WORKERS = max(1, int(arg_value("--workers", str(DEFAULT_WORKERS))))
+RATE = float(arg_value("--rate", "20"))  # requests/second over all hosts, 0 = unlimited
+HOST_CONCURRENCY = max(1, int(arg_value("--host-concurrency", "4")))
+HOST_RATE = float(arg_value("--host-rate", "10"))
+REQUEST_TIMEOUT = 30
+RETRIES = 3  # connection errors and 429/5xx responses, with backoff
+CHUNK_SIZE = 1 << 16
+PART_SUFFIX = ".part"
+PART_VALIDATOR_SUFFIX = ".json"  # beside the .part: {"url", "if_range"} for resuming
+
+
+def parse_host_limits(specs):
+    """{host: (concurrency, rate)} from HOST=N/R strings (R defaults to HOST_RATE)."""
+    limits = {}
+    for spec in specs:
+        host, _, value = spec.partition("=")
+        concurrency, _, rate = value.partition("/")
+        limits[host] = (int(concurrency), float(rate or HOST_RATE))
+    return limits
+
+
+# host -> (max requests in flight, requests/second); --host-limit adds more
+HOST_LIMITS = parse_host_limits(arg_values("--host-limit"))
+
+
+def split_urls(cell_val):
+    """(urls, skipped) from one Project List URL cell: (url, filename) pairs and non-xlsx names."""
+    urls = []
+    skipped = []
+    if not cell_val or not str(cell_val).strip().startswith("http"):
+        return urls, skipped
+    # Some cells contain multiple URLs separated by newlines
+    for url in str(cell_val).strip().split("\n"):
+        url = url.strip()
+        if not url.startswith("http"):
+            continue
+        filename = unquote(url.split("/")[-1])
+        if not filename.lower().endswith(".xlsx"):
+            skipped.append(filename)
+            continue
+        urls.append((url, filename))
+    return urls, skipped
 
 
 def extract_urls(path):
@@ -25,27 +145,413 @@ def extract_urls(path):
     urls = []
     skipped = []
     for row in ws.iter_rows(min_row=2, min_col=2, max_col=2, values_only=True):
-        cell_val = row[0]
-        if not cell_val or not str(cell_val).strip().startswith("http"):
-            continue
-        # Some cells contain multiple URLs separated by newlines
-        for url in str(cell_val).strip().split("\n"):
-            url = url.strip()
-            if not url.startswith("http"):
-                continue
-            filename = unquote(url.split("/")[-1])
-            if not filename.lower().endswith(".xlsx"):
-                skipped.append(filename)
-                continue
-            urls.append((url, filename))
+        cell_urls, cell_skipped = split_urls(row[0])
+        urls.extend(cell_urls)
+        skipped.extend(cell_skipped)
 
     wb.close()
     return urls, skipped
 
 
-def download_files(urls, output_dir, test_mode=False):
-    """Download files from URL list into output_dir."""
+def load_url_index(path=PARSED_PROJECT_LIST):
+    """Index the URLs in project_list_parsed.json.
+
+    Returns (index, skipped): index maps url -> {"filename", "record"} in
+    Project List order, where record is the parsed row it came from;
+    skipped lists non-xlsx filenames. A URL listed on several rows keeps
+    its first row, as the workbook scan's first URL wins.
+    """
+    with open(path) as f:
+        records = json.load(f)["records"]
+    index = {}
+    skipped = []
+    for record in records:
+        cell_urls, cell_skipped = split_urls(record.get("download_url"))
+        for url, filename in cell_urls:
+            index.setdefault(url, {"filename": filename, "record": record})
+        skipped.extend(cell_skipped)
+    return index, skipped
+
+
+def submission_time(record):
+    """A record's submission_date as a datetime, or None if missing or unparseable."""
+    value = record.get("submission_date")
+    for fmt in SUBMISSION_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def newest_first(urls, index):
+    """urls reordered by their record's submission_date, newest first; undated last."""
+    # reverse=True keeps ties in their original order
+    return sorted(urls, key=lambda item: submission_time(index[item[0]]["record"]) or datetime.min,
+                  reverse=True)
+
+
+def load_urls(from_parsed=FROM_PARSED, newest=NEWEST_FIRST):
+    """(urls, skipped, source) per --from-parsed/--newest-first.
+
+    The parsed project list is used when asked for and present, or
+    whenever --newest-first needs its submission dates.
+    """
+    if (from_parsed or newest) and os.path.exists(PARSED_PROJECT_LIST):
+        if os.path.getmtime(PARSED_PROJECT_LIST) < os.path.getmtime(PROJECT_LIST):
+            print(f"WARNING: {PARSED_PROJECT_LIST} is older than the Project List; "
+                  f"rerun parse_project_list.py")
+        index, skipped = load_url_index()
+        urls = [(url, entry["filename"]) for url, entry in index.items()]
+        if newest:
+            urls = newest_first(urls, index)
+        return urls, skipped, PARSED_PROJECT_LIST
+    if from_parsed or newest:
+        print(f"{PARSED_PROJECT_LIST} not found; reading the Project List")
+    urls, skipped = extract_urls(PROJECT_LIST)
+    return urls, skipped, PROJECT_LIST
+
+
+def save_deduplicated(part, digest, dest, content_index):
+    """Move the finished download part to dest, or hard-link dest to an identical earlier file.
+
+    digest is the SHA-256 of part; content_index maps SHA-256 -> first path
+    saved with that content. Both moves are atomic. Returns that earlier
+    path when dest is a duplicate, else None.
+    """
+    # dest is about to hold new content; forget what it held before
+    for stale in [d for d, path in content_index.items() if path == dest and d != digest]:
+        del content_index[stale]
+    original = content_index.get(digest)
+    if original == dest:
+        original = None  # dest fetched again with the same content
+    if original and os.path.exists(original):
+        link = dest + ".link"
+        try:
+            # Link beside dest, then rename over it: dest may be an older copy
+            os.link(original, link)
+            os.replace(link, dest)
+            os.remove(part)
+            return original
+        except OSError:
+            pass  # No hard links on this filesystem; store a copy
+    os.replace(part, dest)
+    if original:
+        return original
+    content_index[digest] = dest
+    return None
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: acquire() blocks until a request may start.
+
+    Tokens refill at rate per second up to burst, so short bursts go out at
+    once and the long-run rate stays at rate. rate 0 means unlimited.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostPolicies:
+    """Per-host politeness: a concurrency cap and a TokenBucket for each host.
+
+    limits maps host -> (concurrency, rate); other hosts get the defaults.
+    """
+
+    def __init__(self, concurrency=HOST_CONCURRENCY, rate=HOST_RATE, limits=None):
+        self.default = (concurrency, rate)
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        """(semaphore, bucket) for host, created on first use."""
+        with self.lock:
+            if host not in self.hosts:
+                concurrency, rate = self.limits.get(host, self.default)
+                self.hosts[host] = (threading.BoundedSemaphore(concurrency), TokenBucket(rate))
+            return self.hosts[host]
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """A requests session with a connection pool big enough for pool_size threads."""
+    session = requests.Session()
+    retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class DownloadError(Exception):
+    """A download that cannot be used: wrong size or not a valid .xlsx."""
+
+
+class IncompleteDownload(DownloadError):
+    """The transfer ended early; the .part file is kept and resumed."""
+
+
+def is_valid_xlsx(path):
+    """True if path is a complete zip whose members all pass their CRC check."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return zf.testzip() is None
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def file_sha256(path, size=None):
+    """hashlib.sha256 object over the first size bytes of path (all of it by default)."""
+    sha = hashlib.sha256()
+    remaining = os.path.getsize(path) if size is None else size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            sha.update(chunk)
+            remaining -= len(chunk)
+    return sha
+
+
+def load_manifest(path):
+    """{filename: entry} from a download manifest, or {} if there is none."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest["files"]
+
+
+def save_manifest(files, path):
+    """Write the manifest atomically, filenames sorted."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": dict(sorted(files.items()))}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def manifest_entry(url, dest, meta):
+    """Manifest record for a file just saved at dest from url (meta from stream_to_part)."""
+    stat = os.stat(dest)
+    return {
+        "url": url,
+        "etag": meta["etag"],
+        "last_modified": meta["last_modified"],
+        "size": stat.st_size,
+        "sha256": meta["sha256"],
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def existing_entry(url, dest):
+    """Manifest record for a file already at dest that no download recorded.
+
+    It has no validators (etag, last_modified, fetched_at are None), so a
+    refresh transfers the file again.
+    """
+    entry = manifest_entry(url, dest, {"sha256": file_sha256(dest).hexdigest(),
+                                       "etag": None, "last_modified": None})
+    entry["fetched_at"] = None
+    return entry
+
+
+def conditional_headers(entry):
+    """If-None-Match/If-Modified-Since headers from a manifest entry's validators."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def manifest_content_index(manifest, output_dir):
+    """SHA-256 -> path for manifest entries whose file is still on disk unchanged.
+
+    Seeds save_deduplicated's content_index, so a download identical to a
+    file from an earlier run is hard-linked to it as well.
+    """
+    content_index = {}
+    for filename, entry in sorted(manifest.items()):
+        path = os.path.join(output_dir, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+            content_index.setdefault(entry["sha256"], path)
+    return content_index
+
+
+def part_validator_path(part):
+    return part + PART_VALIDATOR_SUFFIX
+
+
+def load_part_validator(part, url):
+    """If-Range value recorded when part was started from url, or None."""
+    try:
+        with open(part_validator_path(part)) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved.get("if_range") if saved.get("url") == url else None
+
+
+def save_part_validator(part, url, resp):
+    """Record resp's strong ETag, else its Last-Modified, for resuming part later."""
+    etag = resp.headers.get("ETag")
+    # If-Range only takes a strong ETag
+    if etag and not etag.startswith("W/"):
+        if_range = etag
+    else:
+        if_range = resp.headers.get("Last-Modified")
+    if not if_range:
+        remove_part_validator(part)
+        return
+    path = part_validator_path(part)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"url": url, "if_range": if_range}, f)
+    os.replace(path + ".tmp", path)
+
+
+def remove_part_validator(part):
+    try:
+        os.remove(part_validator_path(part))
+    except FileNotFoundError:
+        pass
+
+
+def stream_to_part(session, url, part, validators=None):
+    """Stream url into part, continuing from its current size.
+
+    A resumed request sends If-Range with the validator saved when part was
+    started, so the server sends the whole file if it has changed since; a
+    part with no saved validator is started over. validators are conditional
+    headers (conditional_headers) sent with a fresh request.
+
+    Returns None if the server answers 304 Not Modified, else {"sha256",
+    "etag", "last_modified"} for the finished part. Raises
+    IncompleteDownload when fewer bytes arrive than the server announced
+    (part is kept for the next attempt), DownloadError when the finished
+    file is not a valid .xlsx (part is removed).
+    """
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    if_range = load_part_validator(part, url) if offset else None
+    if if_range:
+        headers = {"Range": f"bytes={offset}-", "If-Range": if_range}
+    else:
+        offset = 0  # nothing to tell whether the part is still current
+        headers = dict(validators or {})
+    with session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as resp:
+        if resp.status_code == 304:
+            return None
+        if resp.status_code == 416:
+            # The part is already as long as the file; start over to be sure of it
+            os.remove(part)
+            remove_part_validator(part)
+            raise IncompleteDownload("range not satisfiable, restarting")
+        resp.raise_for_status()
+        encoded = resp.headers.get("Content-Encoding", "identity") != "identity"
+        length = resp.headers.get("Content-Length")
+        total = None if encoded or length is None else int(length)
+        match = re.match(r"bytes (\d+)-\d+/(\d+)", resp.headers.get("Content-Range", ""))
+        if resp.status_code == 206 and match and int(match.group(1)) == offset:
+            total = int(match.group(2))
+            sha = file_sha256(part, offset)
+            mode = "ab"
+        else:
+            # Fresh download, the file changed (If-Range) or the server ignored Range
+            sha = hashlib.sha256()
+            mode = "wb"
+            save_part_validator(part, url, resp)
+        with open(part, mode) as f:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                sha.update(chunk)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    size = os.path.getsize(part)
+    if total is not None and size != total:
+        raise IncompleteDownload(f"got {size} of {total} bytes")
+    remove_part_validator(part)
+    if not is_valid_xlsx(part):
+        os.remove(part)
+        raise DownloadError("not a valid .xlsx (zip) file")
+    return {"sha256": sha.hexdigest(), "etag": etag, "last_modified": last_modified}
+
+
+def fetch(session, url, dest, limiter, policies, validators=None):
+    """Download url to dest + PART_SUFFIX once the global and per-host limits allow.
+
+    Dropped transfers are resumed up to RETRIES times. Returns the part
+    path and stream_to_part's result (None if not modified).
+    """
+    part = dest + PART_SUFFIX
+    slots, bucket = policies.get(urlsplit(url).hostname)
+    for attempt in range(RETRIES + 1):
+        limiter.acquire()
+        with slots:
+            bucket.acquire()
+            try:
+                return part, stream_to_part(session, url, part, validators)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, IncompleteDownload):
+                if attempt == RETRIES:
+                    raise
+
+
+def download_files(urls, output_dir, test_mode=False, workers=WORKERS, rate=RATE,
+                   policies=None, session=None, refresh=REFRESH, on_complete=None):
+    """Download files from URL list into output_dir.
+
+    workers threads share session (a pooled make_session() by default);
+    rate caps requests per second overall and policies (HostPolicies) caps
+    each host. With refresh, existing files are requested again with their
+    manifest validators and replaced only if they changed; files with no
+    validators recorded are transferred again in full. Existing files
+    missing from the manifest are hashed and recorded without validators.
+
+    on_complete(filename, path, digest) is called from the calling thread
+    for every file in place: existing ones once the first downloads have
+    started, then each download as it lands (digest is its SHA-256, or
+    None where it was not computed). At most 2 * workers downloads are
+    queued at a time, so a callback that blocks holds back further
+    downloads.
+
+    Returns (downloaded, failures, already_exists, duplicates), where
+    duplicates lists (filename, original_filename) pairs of identical
+    content and already_exists includes files the server reported not
+    modified. failures are in URL order.
+    """
     os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
 
     if test_mode:
         urls = urls[:5]
@@ -55,51 +561,128 @@ def download_files(urls, output_dir, test_mode=False):
     downloaded = 0
     failures = []
     already_exists = 0
+    duplicates = []
 
+    pending = []
+    queued = set()
+    existing = []  # on_complete calls for files already in place
     for i, (url, filename) in enumerate(urls, 1):
         dest = os.path.join(output_dir, filename)
-
-        if os.path.exists(dest):
+        if os.path.exists(dest) and not zipfile.is_zipfile(dest):
+            print(f"[{i}/{total}] Truncated, downloading again: {filename}")
+            os.remove(dest)
+        validators = None
+        if os.path.exists(dest) and refresh and dest not in queued:
+            entry = manifest.get(filename)
+            if entry and entry["url"] == url:
+                validators = conditional_headers(entry)
+        elif os.path.exists(dest) or dest in queued:
+            # queued: the same filename listed twice; the first URL wins
             already_exists += 1
             downloaded += 1
             if i % 50 == 0 or test_mode:
                 print(f"[{i}/{total}] Already exists: {filename}")
+            if os.path.exists(dest):
+                if filename not in manifest:
+                    manifest[filename] = existing_entry(url, dest)
+                existing.append((filename, dest, None))
             continue
+        pending.append((i, url, filename, dest, validators))
+        queued.add(dest)
+    # Built after existing files are recorded, so downloads link to them too
+    content_index = manifest_content_index(manifest, output_dir)
 
-        try:
-            resp = requests.get(url, timeout=30)
-            resp.raise_for_status()
-            with open(dest, "wb") as f:
-                f.write(resp.content)
-            downloaded += 1
-            if i % 50 == 0 or test_mode:
-                print(f"[{i}/{total}] Downloaded: {filename}")
-        except Exception as e:
-            failures.append((filename, str(e)))
-            print(f"[{i}/{total}] FAILED: {filename} — {e}")
-
-        # Small delay to avoid hammering the server
-        if not test_mode and i % 100 == 0:
-            time.sleep(1)
+    limiter = TokenBucket(rate)
+    policies = policies or HostPolicies()
+    own_session = session is None
+    session = session or make_session(workers)
+    save_lock = threading.Lock()  # content_index and same-content hard links
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            jobs = iter(pending)
+            running = {}
+            done = 0
+            while True:
+                # Keep every thread busy, but queue no further ahead than that
+                for i, url, filename, dest, validators in jobs:
+                    future = pool.submit(fetch, session, url, dest, limiter, policies, validators)
+                    running[future] = (i, url, filename, dest)
+                    if len(running) >= 2 * workers:
+                        break
+                # Existing files are announced once the first downloads are under way
+                if on_complete:
+                    for args in existing:
+                        on_complete(*args)
+                existing = []
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i, url, filename, dest = running.pop(future)
+                    done += 1
+                    try:
+                        part, meta = future.result()
+                        downloaded += 1
+                        if meta is None:
+                            already_exists += 1
+                            status = "Not modified"
+                            digest = manifest[filename]["sha256"]
+                        else:
+                            with save_lock:
+                                original = save_deduplicated(part, meta["sha256"], dest,
+                                                             content_index)
+                            manifest[filename] = manifest_entry(url, dest, meta)
+                            if original:
+                                duplicates.append((filename, os.path.basename(original)))
+                            status = "Downloaded"
+                            digest = meta["sha256"]
+                        if done % 50 == 0 or test_mode:
+                            print(f"[{done}/{len(pending)}] {status}: {filename}")
+                    except Exception as e:
+                        failures.append((i, filename, str(e)))
+                        print(f"[{done}/{len(pending)}] FAILED: {filename} — {e}")
+                        continue
+                    finally:
+                        if done % MANIFEST_EVERY == 0:
+                            save_manifest(manifest, manifest_path)
+                    if on_complete:
+                        on_complete(filename, dest, digest)
+    finally:
+        if own_session:
+            session.close()
+        save_manifest(manifest, manifest_path)
 
-    return downloaded, failures, already_exists
+    failures = [(filename, err) for i, filename, err in sorted(failures)]
+    return downloaded, failures, already_exists, duplicates
 
 
 def main():
-    print(f"Reading Project List: {PROJECT_LIST}")
-    urls, skipped = extract_urls(PROJECT_LIST)
+    urls, skipped, source = load_urls()
+    print(f"Read URLs from: {source}{' (newest first)' if NEWEST_FIRST else ''}")
     print(f"Found {len(urls)} xlsx URLs, {len(skipped)} non-xlsx skipped")
 
     if skipped:
         print(f"Skipped non-xlsx files: {skipped[:5]}...")
 
-    print(f"\nDownloading to: {OUTPUT_DIR}")
-    downloaded, failures, already_exists = download_files(urls, OUTPUT_DIR, TEST_MODE)
+    print(f"\n{'Refreshing' if REFRESH else 'Downloading'} to: {OUTPUT_DIR} ({WORKERS} workers, "
+          f"{RATE or 'unlimited'} req/s, {HOST_CONCURRENCY} per host)")
+    if REFRESH:
+        manifest = load_manifest(os.path.join(OUTPUT_DIR, MANIFEST_NAME))
+        unvalidated = [filename for url, filename in urls
+                       if os.path.exists(os.path.join(OUTPUT_DIR, filename))
+                       and not conditional_headers(manifest.get(filename, {}))]
+        if unvalidated:
+            print(f"{len(unvalidated)} existing files have no validators in the manifest "
+                  f"and will be transferred again in full")
+    downloaded, failures, already_exists, duplicates = download_files(urls, OUTPUT_DIR, TEST_MODE)
 
     print(f"\n--- RESULTS ---")
     print(f"Total xlsx URLs: {len(urls)}")
     print(f"Downloaded: {downloaded}")
-    print(f"Already existed: {already_exists}")
+    print(f"Already existed{' or not modified' if REFRESH else ''}: {already_exists}")
+    print(f"Identical to another download (hard-linked): {len(duplicates)}")
+    for fn, original in duplicates[:10]:
+        print(f"  {fn} == {original}")
     print(f"Failures: {len(failures)}")
     if failures:
         print("Failed files:")
@@ -4,24 +4,153 @@ Scan every .xlsx file in historical_estimates/ and extract structured data.
 
 Uses read_only=True with iter_rows → grid dict pattern for performance.
 NEVER uses ws.cell() in read_only mode (O(n) per access).
+
+Pass --workers N to fan scan_file out across N processes. Results are
+merged back in filename order, so output is identical to a serial run.
+
+Results are cached in scan_cache/v<EXTRACTOR_VERSION>/<sha256>.json keyed by
+file content hash, so only new or changed workbooks are rescanned. Bump
+EXTRACTOR_VERSION whenever the extraction logic changes; pass --no-cache to
+force a full rescan.
+
+Pass --jsonl to stream one compact record per file as each scan completes,
+followed by a {"record": "summary", ...} trailer, instead of holding every
+result for one scan_results.json dump. Lines go to the partial file below,
+which becomes scan_results.jsonl once the trailer is written.
+
+Every item row of every section on every client tab is also extracted
+(see extract_line_items) and written to the typed columnar store in
+line_items/ (see line_item_store.py), where is_main_tab marks the rows
+from each workbook's main_tab. Item rows travel in the cache but not in
+scan_results.json.
+
+Client tabs sharing a name prefix are version tabs, listed flat in sheet
+order as version_tabs (see version_tab_names). version_groups splits them
+into families by name stem, the name without its date suffix, each family's
+tabs ordered by date (see group_versions).
+Every version tab is extracted in the same workbook pass, and
+version_history records each family's section totals and labor rates for
+its first tab, then what changed in each later one (see version_history).
+
+Content hashes come from download_estimates.py's download_manifest.json
+for files whose size and mtime still match it; other files are read and
+hashed.
+
+Byte-identical workbooks (same SHA-256) are scanned once per run and the
+result is copied to every filename sharing the content. The groups are
+written to dedup_report.json.
+
+Every run appends finished results to scan_results.partial.jsonl and records
+the completed filenames in scan_checkpoint.json every CHECKPOINT_EVERY files.
+If a run dies, pass --resume to keep the checkpointed results and carry on
+from the next file; the final output is the same as an uninterrupted run.
+The partial file has no line items, so resumed files take theirs from the
+scan cache, and those without a cache entry are scanned again. Both files
+are removed once the output is written.
+
+Pass --reader xml to stream sheet XML straight out of the xlsx zip instead
+of going through openpyxl worksheets. Both readers produce identical
+results; --compare-readers scans with each and reports timings and any
+mismatches without writing scan_results.json.
+
+Pass --timeout SECONDS and/or --max-memory MB to run each scan in its own
+process under a wall-clock limit and an address-space ceiling (Unix). A file
+that breaches either is killed and recorded as an error with error_type
+"timeout" or "oom" instead of stalling the run. The slowest scans are listed
+at the end of every run.
+
+Pass --profile to time each scan_file phase (workbook open, grid loads,
+SKIP_TABS row counts, format detection, section detection, line items, and
+the row sweep for financials, labor roles and the recap check). Each result
+gets a "profile" entry with per-phase seconds and cells loaded. The run
+ends with p50/p90/p99 per phase and the worst files sorted by
+--profile-sort KEY: total (the default), cells, a phase name, or one of the
+per-file memory figures below. --profile-memory also records each phase's
+peak Python allocation via tracemalloc, and the file's overall peak as
+peak_mb, which makes parsing several times slower. When each scan runs in
+its own process (--timeout/--max-memory), peak_rss_mb records that
+process's peak RSS; a shared worker's RSS only ever rises, so it is not
+recorded otherwise. Profiles are never cached, so add --no-cache to
+profile every file.
+
+Pass --bounded to load only what extraction reads: columns A-Z, and rows
+down to the GRAND TOTAL row (never fewer than MIN_BOUNDED_ROWS). Rows past
+the bound are counted but not parsed into the grid. Bounded results are
+not written to the cache, so a later full run never reuses them.
+
+Row counts come from each sheet's <dimension> when its last row is present
+in the XML (see has_row_tag), otherwise from counting rows. Pass
+--skip-tab-counts to record None for SKIP_TABS instead of counting them;
+those results are not written to the cache.
 """
 
+import bisect
+import datetime
+import hashlib
 import json
+import multiprocessing
+import multiprocessing.connection
 import os
+import posixpath
 import re
+import shutil
 import sys
 import time
 import traceback
+import tracemalloc
+import zipfile
 from collections import defaultdict
+from xml.etree.ElementTree import fromstring, iterparse
 
 import openpyxl
+from line_item_store import LineItemWriter
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, WINDOWS_EPOCH, from_excel, from_ISO8601
+from openpyxl.xml.constants import SHARED_STRINGS, XLSM, XLSX, XLTM, XLTX
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_DIR = os.path.join(PROJECT_ROOT, "historical_estimates")
 OUTPUT = os.path.join(PROJECT_ROOT, "scan_results.json")
+OUTPUT_JSONL = os.path.join(PROJECT_ROOT, "scan_results.jsonl")
+PARTIAL_OUTPUT = os.path.join(PROJECT_ROOT, "scan_results.partial.jsonl")
+CHECKPOINT = os.path.join(PROJECT_ROOT, "scan_checkpoint.json")
+DEDUP_REPORT = os.path.join(PROJECT_ROOT, "dedup_report.json")
+CACHE_ROOT = os.path.join(PROJECT_ROOT, "scan_cache")
+MANIFEST = os.path.join(INPUT_DIR, "download_manifest.json")  # from download_estimates.py
+
+# Bump whenever extraction logic changes; older cache entries are discarded.
+EXTRACTOR_VERSION = 6
+CACHE_DIR = os.path.join(CACHE_ROOT, f"v{EXTRACTOR_VERSION}")
+
+
+def arg_value(flag, default=None):
+    """Return the value following flag in sys.argv, or default if absent."""
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
 
 TEST_MODE = "--test" in sys.argv
 TEST_COUNT = 5
+WORKERS = max(1, int(arg_value("--workers", "1")))
+NO_CACHE = "--no-cache" in sys.argv
+JSONL = "--jsonl" in sys.argv
+RESUME = "--resume" in sys.argv
+TIMEOUT = float(arg_value("--timeout", "0")) or None
+MAX_MEMORY_MB = int(arg_value("--max-memory", "0")) or None
+SKIP_TAB_COUNTS = "--skip-tab-counts" in sys.argv
+PROFILE_MEMORY = "--profile-memory" in sys.argv
+PROFILE = "--profile" in sys.argv or PROFILE_MEMORY
+PROFILE_SORT = arg_value("--profile-sort", "total")
+CHECKPOINT_EVERY = 25
+SLOWEST_COUNT = 10
+READER = arg_value("--reader", "openpyxl")
+BOUNDED = "--bounded" in sys.argv
+COMPARE_READERS = "--compare-readers" in sys.argv
 
 SECTION_HEADERS = {
     "PLANNING & ADMINISTRATION",
@@ -48,20 +177,510 @@ ALIAS_MAP = {
 
 SKIP_TABS = {"Overview", "Templates", "ROS", "Labor Log", "Template", "Run of Show"}
 
+# Bounded loading: no extractor reads past column Z, and GL-code detection
+# (rows 1-199) and the recap check (rows 10-110) run regardless of GRAND TOTAL
+MAX_EXTRACT_COL = 26
+MIN_BOUNDED_ROWS = 199
+
+# Format detection windows: GL codes in column A of rows 1-199 (client tabs),
+# FORMAT_B keywords in columns B and O of rows 4-13 (every non-skip tab).
+# Tabs with "Template" in the name are only ever probed for FORMAT_B, so
+# just their FORMAT_B_WINDOW (rows x columns from A1) is loaded.
+GL_CODE_ROWS = range(1, 200)
+FORMAT_B_ROWS = range(4, 14)
+FORMAT_B_COLS = (2, 15)  # B, O
+FORMAT_B_WINDOW = (FORMAT_B_ROWS[-1], max(FORMAT_B_COLS))
+
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+ROW_TAG = SHEET_NS + "row"
+CELL_TAG = SHEET_NS + "c"
+VALUE_TAG = SHEET_NS + "v"
+TEXT_TAG = SHEET_NS + "t"
+RUN_TAG = SHEET_NS + "r"
+INLINE_STRING_TAG = SHEET_NS + "is"
+DIMENSION_TAG = SHEET_NS + "dimension"
+SHEET_DATA_TAG = SHEET_NS + "sheetData"
+ROW_OPEN_RE = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+ROW_NUM_RE = re.compile(rb"""\br\s*=\s*["']([^"']*)["']""")
+
+
+class OpenpyxlBook:
+    """openpyxl read_only workbook behind the minimal reader interface."""
+
+    # Unless the dimension checks out, count_rows has to parse every row, so
+    # callers mid-iteration should keep counting from their own iterator
+    fast_row_count = False
+
+    def __init__(self, filepath):
+        self.wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        self.sheetnames = self.wb.sheetnames
+
+    def iter_rows(self, name, max_col=None):
+        """Yield tuples of cell values for every row of a sheet, clipped to max_col."""
+        rows = self.wb[name].iter_rows(values_only=True)
+        if max_col is None:
+            return rows
+        # Slice rather than pass max_col through: openpyxl would then ignore
+        # the sheet dimension and widen rows past it
+        return (row[:max_col] for row in rows)
+
+    def dimension_row_count(self, name):
+        """Row count from the sheet's dimension if has_row_tag confirms it, else None."""
+        ws = self.wb[name]
+        # _get_source is how openpyxl itself streams a read-only sheet's raw
+        # XML; chartsheets have neither it nor a dimension
+        if not hasattr(ws, "_get_source") or ws.max_row is None:
+            return None
+        with ws._get_source() as src:
+            return ws.max_row if has_row_tag(src, ws.max_row) else None
+
+    def count_rows(self, name):
+        """Number of rows iter_rows yields for a sheet."""
+        count = self.dimension_row_count(name)
+        if count is not None:
+            return count
+        return sum(1 for _ in self.wb[name].iter_rows(values_only=True))
+
+    def close(self):
+        self.wb.close()
+
+
+class XmlBook:
+    """Stream sheet XML straight out of the xlsx zip with iterparse.
+
+    Yields the same row tuples as openpyxl's read_only/data_only/values_only
+    path (shared strings, styled dates, booleans, errors, dimension
+    clipping, missing-row filling) without building any cell objects.
+    """
+
+    fast_row_count = True
+
+    def __init__(self, filepath):
+        self.archive = zipfile.ZipFile(filepath)
+        try:
+            self._read_workbook()
+        except Exception:
+            self.archive.close()
+            raise
+
+    def _read_workbook(self):
+        # Locate parts the same way openpyxl does: workbook and shared strings
+        # from [Content_Types].xml, styles at their fixed path
+        names = set(self.archive.namelist())
+        wb_part = "xl/workbook.xml"
+        strings_part = None
+        for override in fromstring(self.archive.read("[Content_Types].xml")):
+            content_type = override.get("ContentType")
+            if content_type in (XLSX, XLSM, XLTX, XLTM):
+                wb_part = override.get("PartName").lstrip("/")
+            elif content_type == SHARED_STRINGS:
+                strings_part = override.get("PartName").lstrip("/")
+
+        rels = {}
+        wb_dir = posixpath.dirname(wb_part)
+        rels_part = posixpath.join(wb_dir, "_rels", posixpath.basename(wb_part) + ".rels")
+        if rels_part in names:
+            for rel in fromstring(self.archive.read(rels_part)):
+                if rel.get("TargetMode") == "External":
+                    continue
+                target = rel.get("Target", "")
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(wb_dir, target))
+                rels[rel.get("Id")] = (rel.get("Type", ""), target)
+
+        root = fromstring(self.archive.read(wb_part))
+        self.epoch = WINDOWS_EPOCH
+        props = root.find(SHEET_NS + "workbookPr")
+        if props is not None and props.get("date1904", "").lower() in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        # Sheets whose part is missing from the archive are dropped, as openpyxl does
+        self.sheetnames = []
+        self.sheet_parts = {}
+        for sheet in root.iter(SHEET_NS + "sheet"):
+            rel_type, target = rels.get(sheet.get(REL_NS + "id"), ("", None))
+            if target not in names:
+                continue
+            self.sheetnames.append(sheet.get("name"))
+            self.sheet_parts[sheet.get("name")] = (rel_type, target)
+
+        self.shared_strings = []
+        if strings_part is not None:
+            self.shared_strings = self._read_shared_strings(strings_part)
+        self.date_formats = set()
+        self.timedelta_formats = set()
+        if "xl/styles.xml" in names:
+            self._read_date_styles("xl/styles.xml")
+
+    def _read_shared_strings(self, part):
+        strings = []
+        with self.archive.open(part) as src:
+            for _, el in iterparse(src):
+                if el.tag == SHEET_NS + "si":
+                    strings.append(text_content(el).replace("x005F_", ""))
+                    el.clear()
+        return strings
+
+    def _read_date_styles(self, part):
+        """Index which cell style ids carry date or timedelta number formats."""
+        root = fromstring(self.archive.read(part))
+        custom = {}
+        num_fmts = root.find(SHEET_NS + "numFmts")
+        if num_fmts is not None:
+            for fmt in num_fmts:
+                custom[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+        cell_xfs = root.find(SHEET_NS + "cellXfs")
+        if cell_xfs is None:
+            return
+        for idx, xf in enumerate(cell_xfs.iter(SHEET_NS + "xf")):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(fmt_id)
+            if is_date_format(fmt):
+                self.date_formats.add(idx)
+            if is_timedelta_format(fmt):
+                self.timedelta_formats.add(idx)
+
+    def _read_dimensions(self, part):
+        # Start events, so a sheet with no <dimension> stops at <sheetData>
+        # instead of after parsing every row
+        with self.archive.open(part) as src:
+            for _, el in iterparse(src, events=("start",)):
+                if el.tag == DIMENSION_TAG:
+                    return range_boundaries(el.get("ref"))
+                if el.tag == SHEET_DATA_TAG:
+                    break
+        return None
 
-def load_grid(ws):
-    """Load all cell values from a worksheet into a dict of (row, col) -> value."""
-    grid = {}
-    for row_idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
-        for col_idx, val in enumerate(row, start=1):
-            if val is not None:
-                grid[(row_idx, col_idx)] = val
-    return grid
+    def _parse_rows(self, part, max_col=None):
+        """Yield (row_idx, [(col, value), ...], last_col) for every <row> element.
+
+        Cells right of max_col are skipped without converting their values;
+        last_col is the column of the row's final cell either way.
+        """
+        row_counter = 0
+        with self.archive.open(part) as src:
+            for _, el in iterparse(src):
+                if el.tag != ROW_TAG:
+                    continue
+                r = el.get("r")
+                row_counter = int(float(r)) if r else row_counter + 1
+                col_counter = 0
+                cells = []
+                for c in el:
+                    if c.tag != CELL_TAG:
+                        continue
+                    coord = c.get("r")
+                    if coord:
+                        col_counter = column_index_from_string(coord.rstrip("0123456789"))
+                    else:
+                        col_counter += 1
+                    if max_col is None or col_counter <= max_col:
+                        cells.append((col_counter, self._cell_value(c)))
+                el.clear()
+                yield row_counter, cells, col_counter
+
+    def _cell_value(self, c):
+        data_type = c.get("t", "n")
+        if data_type == "inlineStr":
+            child = c.find(INLINE_STRING_TAG)
+            return text_content(child) if child is not None else None
+        value = c.findtext(VALUE_TAG) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            value = float(value) if "." in value or "E" in value or "e" in value else int(value)
+            style_id = int(c.get("s") or 0)
+            if style_id in self.date_formats:
+                try:
+                    return from_excel(value, self.epoch,
+                                      timedelta=style_id in self.timedelta_formats)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value
+
+    def _sheet_part(self, name):
+        rel_type, part = self.sheet_parts[name]
+        if rel_type.endswith("/chartsheet"):
+            # Same error openpyxl raises when iterating a chartsheet
+            raise AttributeError("'Chartsheet' object has no attribute 'iter_rows'")
+        return part
+
+    def iter_rows(self, name, max_col=None):
+        """Yield tuples of cell values for every row of a sheet, clipped to max_col."""
+        part = self._sheet_part(name)
+        dims = self._read_dimensions(part)
+        dim_max_col = max_row = None
+        if dims is not None:
+            _, _, dim_max_col, max_row = dims
+        empty_row = (None,) * dim_max_col if dim_max_col is not None else []
+        if max_col is not None:
+            empty_row = empty_row[:max_col]
+
+        counter = 1
+        idx = 1
+        for idx, cells, last_col in self._parse_rows(part, max_col):
+            if max_row is not None and idx > max_row:
+                break
+            # Fill in rows missing from the XML
+            while counter < idx:
+                counter += 1
+                yield empty_row
+            if counter <= idx:
+                counter += 1
+                if not last_col and not dim_max_col:
+                    yield ()
+                    continue
+                width = dim_max_col or last_col
+                if max_col is not None:
+                    width = min(width, max_col)
+                row = [None] * width
+                for col, val in cells:
+                    if 1 <= col <= width:
+                        row[col - 1] = val
+                yield tuple(row)
+        if max_row is not None and max_row < idx:
+            while counter <= max_row:
+                counter += 1
+                yield empty_row
+
+    def dimension_row_count(self, name):
+        """Row count from the sheet's dimension if has_row_tag confirms it, else None."""
+        part = self._sheet_part(name)
+        dims = self._read_dimensions(part)
+        if dims is None or dims[3] is None:
+            return None
+        with self.archive.open(part) as src:
+            return dims[3] if has_row_tag(src, dims[3]) else None
+
+    def count_rows(self, name):
+        """Number of rows iter_rows yields for a sheet, without parsing any cells.
+
+        Uses dimension_row_count when it can. Otherwise scans the raw XML for
+        <row> tags and applies the same rules as iter_rows: rows are numbered
+        by their r attribute (or follow the previous row), and counting stops
+        at the dimension's last row.
+        """
+        count = self.dimension_row_count(name)
+        if count is not None:
+            return count
+        part = self._sheet_part(name)
+        dims = self._read_dimensions(part)
+        max_row = dims[3] if dims is not None else None
+        last = idx = 0
+        tail = b""
+        with self.archive.open(part) as src:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                buf = tail + chunk
+                # Leave a possibly incomplete tag for the next chunk
+                cut = buf.rfind(b"<")
+                buf, tail = buf[:cut], buf[cut:]
+                for m in ROW_OPEN_RE.finditer(buf):
+                    r = ROW_NUM_RE.search(m.group(1))
+                    idx = int(float(r.group(1))) if r else idx + 1
+                    if max_row is not None and idx > max_row:
+                        return max_row
+                    last = max(last, idx)
+        for m in ROW_OPEN_RE.finditer(tail):
+            r = ROW_NUM_RE.search(m.group(1))
+            idx = int(float(r.group(1))) if r else idx + 1
+            if max_row is not None and idx > max_row:
+                return max_row
+            last = max(last, idx)
+        return last
+
+    def close(self):
+        self.archive.close()
+
+
+def has_row_tag(src, row):
+    """True if the raw sheet XML stream src contains a <row r="row"> tag.
+
+    Both readers stop at the dimension's last row and yield every row up to
+    it once a row that far down exists, so when the dimension's last row is
+    really in the XML the dimension gives the exact row count. This is a byte
+    search, so it costs decompression but no XML parsing. Rows written
+    without an r attribute, or with r after other attributes, are not found
+    and fall back to a full count.
+    """
+    needle = b'<row r="%d"' % row
+    tail = b""
+    for chunk in iter(lambda: src.read(1 << 20), b""):
+        buf = tail + chunk
+        if needle in buf:
+            return True
+        tail = buf[-(len(needle) - 1):]
+    return False
+
+
+def text_content(el):
+    """Plain text of a <si> or <is> element: direct <t> plus rich-text runs."""
+    snippets = []
+    plain = el.find(TEXT_TAG)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in el.findall(RUN_TAG):
+        t = run.find(TEXT_TAG)
+        if t is not None and t.text is not None:
+            snippets.append(t.text)
+    return "".join(snippets)
+
+
+READERS = {"openpyxl": OpenpyxlBook, "xml": XmlBook}
+
+
+class Grid:
+    """Row-major cell store: rows[r - 1] is the tuple of values in row r.
+
+    Rows are kept as the tuples the reader yields, with trailing empty
+    cells trimmed (sheet dimensions can claim thousands of columns), so
+    there is no (row, col) key or hash entry per cell. Trailing rows with
+    no values are dropped; max_row is the last row holding a value.
+    """
+
+    __slots__ = ("rows", "max_row", "col_b")
+
+    def __init__(self):
+        self.rows = []
+        self.max_row = 0
+        self.col_b = None  # ColumnBIndex, built on first use
+
+    def add_row(self, row):
+        empty = row.count(None)
+        if empty == len(row):
+            self.rows.append(())
+            return
+        if empty and row[-1] is None:
+            end = len(row) - 1
+            while row[end - 1] is None:
+                end -= 1
+            row = row[:end]
+        self.rows.append(row)
+        self.max_row = len(self.rows)
+
+    def finish(self):
+        del self.rows[self.max_row:]
+        return self
+
+
+def load_sheet_data(book, name, keep_grid=True, bounded=False, window=None):
+    """Load all cell data from sheet name of a reader book in a single pass.
+
+    When keep_grid is False the rows are only counted, which is all the
+    SKIP_TABS sheets are needed for. When bounded is True only columns A-Z
+    are kept, and loading stops at the GRAND TOTAL row (but not before
+    MIN_BOUNDED_ROWS); the remaining rows are counted without being parsed.
+    window=(rows, cols) loads only that block from A1 and counts the rest,
+    for tabs that are only read for format detection.
+
+    Returns: (grid, row_count) where grid is a Grid, or None if keep_grid
+    is False.
+    """
+    if not keep_grid:
+        return None, book.count_rows(name)
+
+    grid = Grid()
+    row_count = 0
+    last_row = window[0] if window else None
+    max_col = window[1] if window else MAX_EXTRACT_COL if bounded else None
+    rows = book.iter_rows(name, max_col)
+    for row_idx, row in enumerate(rows, start=1):
+        if last_row is not None and row_idx > last_row:
+            if book.fast_row_count:
+                return grid.finish(), book.count_rows(name)
+            count = book.dimension_row_count(name)
+            if count is not None:
+                return grid.finish(), count
+            return grid.finish(), row_idx + sum(1 for _ in rows)
+        row_count = row_idx
+        grid.add_row(row)
+        if bounded and last_row is None and len(row) > 1 and row[1] is not None:
+            if str(row[1]).strip().upper() == "GRAND TOTAL":
+                last_row = max(row_idx, MIN_BOUNDED_ROWS)
+    return grid.finish(), row_count
+
+
+class PhaseProfiler:
+    """Per-phase wall time, cells loaded and peak memory for one scan_file call.
+
+    lap(phase) charges the time since the previous lap to phase, so scan_file
+    marks where each phase ends instead of wrapping it in a block. Repeated
+    phases (one grid load per tab) accumulate. With trace_memory, each phase
+    also records the peak traced allocation reached while it ran.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.phases = {}
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+        self.started = self.last = time.perf_counter()
+
+    def lap(self, phase, cells=0):
+        stats = self.phases.setdefault(phase, {"seconds": 0.0, "cells": 0})
+        stats["seconds"] += time.perf_counter() - self.last
+        stats["cells"] += cells
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            stats["peak_mb"] = max(stats.get("peak_mb", 0.0), peak)
+            tracemalloc.reset_peak()
+        self.last = time.perf_counter()
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        if self.trace_memory:
+            tracemalloc.stop()
+        phases = {}
+        for phase, stats in self.phases.items():
+            phases[phase] = {k: round(v, 6) if isinstance(v, float) else v
+                             for k, v in stats.items()}
+        report = {
+            "total": round(total, 6),
+            "cells": sum(stats["cells"] for stats in self.phases.values()),
+            "phases": phases,
+        }
+        if self.trace_memory:
+            # The peak is reset at every lap, so the largest phase peak is the scan's
+            report["peak_mb"] = round(max((stats.get("peak_mb", 0.0)
+                                           for stats in self.phases.values()), default=0.0), 6)
+        return report
+
+
+def peak_rss_mb():
+    """This process's peak RSS in MB: a per-file figure only in a process that scans one file."""
+    import resource  # Unix only, so imported just when profiling
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return round(maxrss / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; lap() does nothing."""
+
+    def lap(self, phase, cells=0):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
 
 
 def get(grid, row, col):
     """Get value from grid, returns None if not present."""
-    return grid.get((row, col))
+    if 0 < row <= grid.max_row:
+        cells = grid.rows[row - 1]
+        if 0 < col <= len(cells):
+            return cells[col - 1]
+    return None
 
 
 def safe_float(val):
@@ -91,61 +710,99 @@ def is_gl_code(val):
         return False
 
 
-def detect_format(wb, sheet_names):
-    """Detect FORMAT_A, FORMAT_B, or FORMAT_UNKNOWN."""
+FORMAT_B_KEYWORDS = {"revenue", "net rev", "per activation total"}
+
+
+def has_gl_codes(grid):
+    """Check for GL codes in column A, rows 1-199."""
+    return any(is_gl_code(get(grid, row, 1)) for row in GL_CODE_ROWS)
+
+
+def has_format_b_keywords(grid):
+    """Check the P&L summary rows 4-13 for FORMAT_B keywords in B or O."""
+    for row in FORMAT_B_ROWS:
+        for col in FORMAT_B_COLS:
+            val = get(grid, row, col)
+            if val and str(val).strip().lower() in FORMAT_B_KEYWORDS:
+                return True
+    return False
+
+
+def needs_gl_check(sheet_names):
+    """FORMAT_A needs an Overview and a Templates tab before GL codes matter."""
     has_overview = "Overview" in sheet_names
     has_templates = any("Templates" in name or "Template" in name for name in sheet_names)
+    return has_overview and has_templates
 
-    # Check for GL codes in column A of any non-skip tab
-    has_gl_codes = False
-    if has_overview and has_templates:
-        for name in sheet_names:
-            if name in SKIP_TABS or "Template" in name:
-                continue
-            ws = wb[name]
-            grid = load_grid(ws)
-            for row in range(1, 200):
-                if is_gl_code(get(grid, row, 1)):
-                    has_gl_codes = True
-                    break
-            if has_gl_codes:
-                break
 
-    if has_overview and has_templates and has_gl_codes:
+def classify_format(sheet_names, gl_codes_found, format_b_found):
+    """FORMAT_A, FORMAT_B, or FORMAT_UNKNOWN from what the tabs showed.
+
+    gl_codes_found: some non-skip, non-Template tab has GL codes (has_gl_codes).
+    format_b_found: some non-skip tab has FORMAT_B keywords (has_format_b_keywords).
+    """
+    if needs_gl_check(sheet_names) and gl_codes_found:
         return "FORMAT_A"
+    if format_b_found:
+        return "FORMAT_B"
+    return "FORMAT_UNKNOWN"
 
-    # Check FORMAT_B: P&L summary rows 4-13 with keywords in B or O
-    format_b_keywords = {"revenue", "net rev", "per activation total"}
-    for name in sheet_names:
-        if name in SKIP_TABS:
-            continue
-        ws = wb[name]
-        grid = load_grid(ws)
-        for row in range(4, 14):
-            for col in (2, 15):  # B=2, O=15
-                val = get(grid, row, col)
-                if val and str(val).strip().lower() in format_b_keywords:
-                    return "FORMAT_B"
 
-    return "FORMAT_UNKNOWN"
+class ColumnBIndex:
+    """Normalized column-B text and the rows the section lookups care about.
+
+    text maps row -> str(value).strip().upper() for every non-empty B cell;
+    section_rows lists (row, header) for whitelisted section headers;
+    stop_rows/stop_is_total are the sorted rows where a section's total
+    search ends (a "TOTAL..." row or another header); grand_total_row is the
+    first GRAND TOTAL row.
+    """
+
+    __slots__ = ("text", "section_rows", "stop_rows", "stop_is_total", "grand_total_row")
+
+    def __init__(self, grid):
+        self.text = {}
+        self.section_rows = []
+        self.stop_rows = []
+        self.stop_is_total = []
+        self.grand_total_row = None
+        for row_idx, cells in enumerate(grid.rows, start=1):
+            if len(cells) < 2 or cells[1] is None:
+                continue
+            cleaned = str(cells[1]).strip().upper()
+            self.text[row_idx] = cleaned
+            if cleaned.startswith("TOTAL"):
+                self.stop_rows.append(row_idx)
+                self.stop_is_total.append(True)
+            elif cleaned in SECTION_HEADERS:
+                self.section_rows.append((row_idx, cleaned))
+                self.stop_rows.append(row_idx)
+                self.stop_is_total.append(False)
+            elif cleaned == "GRAND TOTAL" and self.grand_total_row is None:
+                self.grand_total_row = row_idx
+
+
+def column_b_index(grid):
+    """Return the grid's ColumnBIndex, building it on first use."""
+    if grid.col_b is None:
+        grid.col_b = ColumnBIndex(grid)
+    return grid.col_b
 
 
 def find_sections(grid, max_row):
     """Find section headers in column B, matching exact whitelist only."""
     sections = {}
-    for row in range(1, max_row + 1):
-        val = get(grid, row, 2)  # Column B
-        if val is None:
-            continue
-        cleaned = str(val).strip().upper()
-        if cleaned in SECTION_HEADERS:
-            canonical = ALIAS_MAP.get(cleaned, cleaned)
-            sections[canonical] = {"start_row": row}
+    for row, cleaned in column_b_index(grid).section_rows:
+        if row > max_row:
+            break
+        canonical = ALIAS_MAP.get(cleaned, cleaned)
+        sections[canonical] = {"start_row": row}
     return sections
 
 
 def find_section_totals(grid, sections, max_row, fmt):
     """Find total rows and values for each section."""
+    index = column_b_index(grid)
     result = {}
     for section_name, info in sections.items():
         start_row = info["start_row"]
@@ -153,18 +810,16 @@ def find_section_totals(grid, sections, max_row, fmt):
         bid_total = None
         recap_total = None
 
-        # Look for "Total ..." row below the section header
-        for row in range(start_row + 1, min(start_row + 100, max_row + 1)):
-            val = get(grid, row, 2)  # Column B
-            if val and str(val).strip().upper().startswith("TOTAL"):
+        # The first "Total ..." row below the header, unless another section
+        # header comes first; only the next 99 rows are searched
+        pos = bisect.bisect_right(index.stop_rows, start_row)
+        if pos < len(index.stop_rows):
+            row = index.stop_rows[pos]
+            if row < min(start_row + 100, max_row + 1) and index.stop_is_total[pos]:
                 total_row = row
                 bid_total = safe_float(get(grid, row, 8))  # Column H
                 if fmt == "FORMAT_A":
                     recap_total = safe_float(get(grid, row, 22))  # Column V
-                break
-            # If we hit another section header, stop
-            if val and str(val).strip().upper() in SECTION_HEADERS:
-                break
 
         result[section_name] = {
             "canonical_name": section_name,
@@ -179,77 +834,113 @@ def find_section_totals(grid, sections, max_row, fmt):
 
 def find_grand_total(grid, max_row):
     """Find the Grand Total row and value in column H."""
-    for row in range(1, max_row + 1):
-        val = get(grid, row, 2)  # Column B
-        if val and str(val).strip().upper() == "GRAND TOTAL":
-            return safe_float(get(grid, row, 8))  # Column H
+    row = column_b_index(grid).grand_total_row
+    if row is not None and row <= max_row:
+        return safe_float(get(grid, row, 8))  # Column H
     return None
 
 
-def extract_financials_a(grid):
-    """Extract FORMAT_A financial headers from rows 3-7."""
-    return {
-        "bid_gross": safe_float(get(grid, 4, 11)),      # K4
-        "bid_net": safe_float(get(grid, 5, 11)),         # K5
-        "bid_margin_dollars": safe_float(get(grid, 4, 12)),  # L4
-        "bid_margin_pct": safe_float(get(grid, 4, 13)),  # M4
-        "recap_gross": safe_float(get(grid, 4, 24)),     # X4
-        "recap_net": safe_float(get(grid, 5, 24)),       # X5
-        "recap_margin_dollars": safe_float(get(grid, 4, 25)),  # Y4
-        "recap_margin_pct": safe_float(get(grid, 4, 26)),  # Z4
-        "payout": safe_float(get(grid, 4, 14)),          # N4
-    }
+class RowConsumer:
+    """One extractor in a sweep_rows pass.
 
+    visit(row, cells) is called for every row from first_row to last_row
+    (1-based, inclusive, up to the grid's max_row) with that row's tuple of
+    values. A consumer that needs nothing more sets done, and the sweep
+    ends once every consumer is done.
+    """
+
+    first_row = last_row = 0
+    done = False
+
+    def visit(self, row, cells):
+        pass
 
-def extract_financials_b(grid):
-    """Extract FORMAT_B financial headers from rows 4-9, columns O-P."""
-    return {
-        "revenue": safe_float(get(grid, 4, 16)),  # P4
-        "net_rev": safe_float(get(grid, 5, 16)),   # P5
-        "gm": safe_float(get(grid, 7, 16)),        # P7
-    }
 
+def cell(cells, col):
+    """Value at 1-based column col of a row tuple, None past its end."""
+    return cells[col - 1] if col <= len(cells) else None
 
-def extract_labor_roles(grid, sections, fmt):
-    """Extract labor roles from ONSITE LABOR ACTIVITY section."""
-    roles = []
-    labor_section = sections.get("ONSITE LABOR ACTIVITY")
-    if not labor_section:
-        return roles
 
-    start_row = labor_section["start_row"]
-    total_row = labor_section.get("total_row")
-    if not total_row:
+class FinancialsA(RowConsumer):
+    """FORMAT_A financial headers from rows 4-5."""
+
+    first_row, last_row = 4, 5
+
+    def __init__(self):
+        self.rows = {}
+
+    def visit(self, row, cells):
+        self.rows[row] = cells
+
+    def result(self):
+        row4, row5 = self.rows.get(4, ()), self.rows.get(5, ())
+        return {
+            "bid_gross": safe_float(cell(row4, 11)),      # K4
+            "bid_net": safe_float(cell(row5, 11)),         # K5
+            "bid_margin_dollars": safe_float(cell(row4, 12)),  # L4
+            "bid_margin_pct": safe_float(cell(row4, 13)),  # M4
+            "recap_gross": safe_float(cell(row4, 24)),     # X4
+            "recap_net": safe_float(cell(row5, 24)),       # X5
+            "recap_margin_dollars": safe_float(cell(row4, 25)),  # Y4
+            "recap_margin_pct": safe_float(cell(row4, 26)),  # Z4
+            "payout": safe_float(cell(row4, 14)),          # N4
+        }
+
+
+class FinancialsB(FinancialsA):
+    """FORMAT_B financial headers from rows 4-7, column P."""
+
+    first_row, last_row = 4, 7
+
+    def result(self):
+        return {
+            "revenue": safe_float(cell(self.rows.get(4, ()), 16)),  # P4
+            "net_rev": safe_float(cell(self.rows.get(5, ()), 16)),   # P5
+            "gm": safe_float(cell(self.rows.get(7, ()), 16)),        # P7
+        }
+
+
+class LaborRoles(RowConsumer):
+    """Labor roles from the ONSITE LABOR ACTIVITY section."""
+
+    def __init__(self, sections, fmt):
+        self.fmt = fmt
+        self.roles = []
+        labor_section = sections.get("ONSITE LABOR ACTIVITY")
+        if not labor_section:
+            self.done = True
+            return
+        start_row = labor_section["start_row"]
+        total_row = labor_section.get("total_row")
         # If no total row found, scan up to 80 rows
-        end_row = start_row + 80
-    else:
-        end_row = total_row
+        end_row = total_row or start_row + 80
+        self.first_row, self.last_row = start_row + 1, end_row - 1
 
-    for row in range(start_row + 1, end_row):
-        role_name = get(grid, row, 2)  # Column B
+    def visit(self, row, cells):
+        role_name = cell(cells, 2)  # Column B
         if not role_name:
-            continue
+            return
         role_str = str(role_name).strip()
         if not role_str or role_str == "---" or role_str.upper() in SECTION_HEADERS:
-            continue
+            return
         if role_str.upper().startswith("TOTAL"):
-            continue
+            return
 
-        unit_rate = safe_float(get(grid, row, 5))  # Column E
+        unit_rate = safe_float(cell(cells, 5))  # Column E
         if unit_rate is None or unit_rate <= 0:
-            continue
+            return
 
         gl_code = None
-        if fmt == "FORMAT_A":
-            gl_val = get(grid, row, 1)  # Column A
+        if self.fmt == "FORMAT_A":
+            gl_val = cell(cells, 1)  # Column A
             if gl_val is not None:
                 gl_code = str(gl_val).strip()
 
-        cost_rate = safe_float(get(grid, row, 13))  # Column M
+        cost_rate = safe_float(cell(cells, 13))  # Column M
 
         has_ot = bool(re.search(r"OT|>10\s*hrs?", role_str, re.IGNORECASE))
 
-        roles.append({
+        self.roles.append({
             "role": role_str,
             "unit_rate": unit_rate,
             "gl_code": gl_code,
@@ -257,144 +948,395 @@ def extract_labor_roles(grid, sections, fmt):
             "has_ot_variant": has_ot,
         })
 
-    return roles
 
+class RecapCheck(RowConsumer):
+    """Whether columns T-Z (20-26) hold a non-zero numeric value in rows 10-110."""
 
-def check_recap_data(grid):
-    """Check if columns T-Z (20-26) have non-zero numeric values in rows 10-110."""
-    for row in range(10, 111):
-        for col in range(20, 27):  # T=20 through Z=26
-            val = get(grid, row, col)
+    first_row, last_row = 10, 110
+
+    def __init__(self):
+        self.found = False
+
+    def visit(self, row, cells):
+        for val in cells[19:26]:  # T=20 through Z=26
             if val is not None:
                 f = safe_float(val)
                 if f is not None and f != 0:
-                    return True
-    return False
+                    self.found = True
+                    self.done = True
+                    return
+
+
+def sweep_rows(grid, consumers):
+    """Feed each grid row, once, to every consumer whose row range covers it.
+
+    Rows past max_row are empty and no consumer takes anything from an
+    empty row, so the sweep stops at max_row.
+    """
+    active = [c for c in consumers if not c.done]
+    if not active:
+        return consumers
+    rows = grid.rows
+    last = min(max(c.last_row for c in active), grid.max_row)
+    for row in range(min(c.first_row for c in active), last + 1):
+        cells = rows[row - 1]
+        finished = False
+        for consumer in active:
+            if consumer.first_row <= row <= consumer.last_row:
+                consumer.visit(row, cells)
+                finished = finished or consumer.done
+        if finished:
+            active = [c for c in active if not c.done]
+            if not active:
+                break
+    return consumers
+
+
+def extract_line_items(grid, tab_name, fmt):
+    """Every item row in every section block of a client tab.
+
+    A block runs from its header to the next TOTAL row or section header
+    (at most 99 rows, as in find_section_totals). Item rows have a name in
+    column B and at least one numeric value among qty, unit rate, bid total,
+    cost rate and the recap columns. Returns rows in line_item_store.COLUMNS
+    order (without the filename and is_main_tab, which the writer adds).
+    """
+    index = column_b_index(grid)
+    max_row = grid.max_row
+    items = []
+    for row, cleaned in index.section_rows:
+        if row > max_row:
+            break
+        section = ALIAS_MAP.get(cleaned, cleaned)
+        pos = bisect.bisect_right(index.stop_rows, row)
+        end_row = min(row + 100, max_row + 1)
+        if pos < len(index.stop_rows):
+            end_row = min(end_row, index.stop_rows[pos])
+
+        for item_row in range(row + 1, end_row):
+            name = index.text.get(item_row)
+            if name == "GRAND TOTAL":
+                break
+            if not name or name == "---":
+                continue
+            values = [safe_float(get(grid, item_row, col))
+                      for col in (3, 5, 8, 13, 20, 21, 22, 23, 24, 25, 26)]  # C E H M T-Z
+            if all(v is None for v in values):
+                continue
+            gl_code = None
+            if fmt == "FORMAT_A":
+                gl_val = get(grid, item_row, 1)  # Column A
+                if gl_val is not None:
+                    gl_code = str(gl_val).strip()
+            items.append([tab_name, section, item_row,
+                          str(get(grid, item_row, 2)).strip(), gl_code, *values])
+    return items
+
+
+def summarize_main_tab(grid, raw_sections):
+    """What scan_file reports from a main-tab candidate, before the format is known.
+
+    Taken while the tab is loaded so its grid can be dropped straight away.
+    Section recap totals and labor GL codes are read as if FORMAT_A and
+    financials for both formats; finish_main_tab applies the real format.
+    """
+    sections = find_section_totals(grid, raw_sections, grid.max_row, "FORMAT_A")
+    financials_a, financials_b = FinancialsA(), FinancialsB()
+    labor = LaborRoles(sections, "FORMAT_A")
+    recap = RecapCheck()
+    sweep_rows(grid, [financials_a, financials_b, labor, recap])
+    return {
+        "sections": sections,
+        "grand_total": find_grand_total(grid, grid.max_row),
+        "financials": {"FORMAT_A": financials_a.result(), "FORMAT_B": financials_b.result()},
+        "labor_roles": labor.roles,
+        "has_recap_data": recap.found,
+    }
 
 
-def detect_versions(sheet_names):
-    """Look for tabs sharing a common prefix with date suffixes."""
-    # Simple heuristic: find tabs that share a long common prefix
-    client_tabs = [n for n in sheet_names if n not in SKIP_TABS and "Template" not in n]
-    if len(client_tabs) <= 1:
-        return []
+def finish_main_tab(summary, fmt):
+    """Drop the FORMAT_A-only fields from a summarize_main_tab result unless fmt is FORMAT_A."""
+    if fmt != "FORMAT_A":
+        for info in summary["sections"].values():
+            info["recap_total"] = None
+        for role in summary["labor_roles"]:
+            role["gl_code"] = None
+    summary["financials"] = summary["financials"].get(fmt, {})
+    return summary
 
-    # Group by common prefix (at least 5 chars)
-    groups = defaultdict(list)
-    for i, name1 in enumerate(client_tabs):
-        for name2 in client_tabs[i + 1:]:
-            # Find longest common prefix
-            prefix_len = 0
-            for a, b in zip(name1, name2):
-                if a == b:
-                    prefix_len += 1
-                else:
-                    break
-            if prefix_len >= 5:
-                prefix = name1[:prefix_len].rstrip()
-                groups[prefix].append(name1)
-                groups[prefix].append(name2)
 
-    version_tabs = []
-    for prefix, tabs in groups.items():
-        unique_tabs = list(set(tabs))
-        if len(unique_tabs) >= 2:
-            version_tabs.extend(unique_tabs)
+VERSION_PREFIX_LEN = 5  # tabs sharing at least this many leading characters are versions
+VERSION_DATE_US = re.compile(r"(\d{1,2})[./-](\d{1,2})[./-](\d{4}|\d{2})$")  # 3.1.24, 01-05-2024
+VERSION_DATE_ISO = re.compile(r"(\d{4})[./-](\d{1,2})[./-](\d{1,2})$")  # 2024-03-01
+
 
-    return list(set(version_tabs)) if version_tabs else []
+def version_date(tab_name):
+    """ISO date from a tab name's date suffix (month-day-year or year-month-day), else None."""
+    name = tab_name.strip()
+    match = VERSION_DATE_ISO.search(name)
+    if match:
+        year, month, day = map(int, match.groups())
+    else:
+        match = VERSION_DATE_US.search(name)
+        if not match:
+            return None
+        month, day, year = map(int, match.groups())
+        if year < 100:
+            year += 2000
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def version_stem(tab_name):
+    """Tab name without its date suffix and trailing separators.
 
+    "Ford Dallas 3.1.24" -> "Ford Dallas". A name that is all date is its own stem.
+    """
+    name = tab_name.strip()
+    match = VERSION_DATE_ISO.search(name) or VERSION_DATE_US.search(name)
+    if match:
+        name = name[:match.start()]
+    return name.rstrip(" ./-_") or tab_name.strip()
 
-def scan_file(filepath, filename):
-    """Scan a single xlsx file and extract all data."""
+
+def version_tab_names(sheet_names):
+    """Client tabs sharing a VERSION_PREFIX_LEN-character prefix with another, in sheet order.
+
+    Two tabs share such a prefix exactly when their first VERSION_PREFIX_LEN
+    characters match, so tabs are bucketed on that key instead of comparing
+    every pair.
+    """
+    client_tabs = [n for n in sheet_names if n not in SKIP_TABS and "Template" not in n]
+    buckets = defaultdict(int)
+    for name in client_tabs:
+        if len(name) >= VERSION_PREFIX_LEN:
+            buckets[name[:VERSION_PREFIX_LEN]] += 1
+    return [n for n in client_tabs
+            if len(n) >= VERSION_PREFIX_LEN and buckets[n[:VERSION_PREFIX_LEN]] > 1]
+
+
+def group_versions(sheet_names):
+    """Split the version tabs into families of revisions of one event.
+
+    A shared prefix only says tabs are versions of something: "Ford Dallas
+    3.1.24" and "Ford Detroit 4.15.24" share "Ford D" but are different
+    events. Families are the version tabs with the same version_stem.
+
+    Returns {stem: [{"tab": name, "date": iso_date_or_None}, ...]} in order
+    of each family's first tab, with each family ordered oldest to newest by
+    its date suffix; undated tabs come first, in sheet order. A version tab
+    with no other revision is a family of one.
+    """
+    families = defaultdict(list)
+    for name in version_tab_names(sheet_names):
+        families[version_stem(name)].append(name)
+
+    groups = {}
+    for stem, tabs in families.items():
+        dated = [{"tab": name, "date": version_date(name)} for name in tabs]
+        dated.sort(key=lambda v: (v["date"] is not None, v["date"] or ""))
+        groups[stem] = dated
+    return groups
+
+
+def version_snapshot(summary):
+    """Section bid totals and labor rates of one version tab (from summarize_main_tab).
+
+    roles lists [role, unit_rate] for every labor row in sheet order, so a
+    role on several rows (e.g. one per day) keeps each row's rate.
+    """
+    return {
+        "grand_total": summary["grand_total"],
+        "sections": {name: info["bid_total"] for name, info in summary["sections"].items()},
+        "roles": [[role["role"], role["unit_rate"]] for role in summary["labor_roles"]],
+    }
+
+
+def role_occurrences(roles):
+    """{(role, n): unit_rate} for the n-th (1-based) row of each role in a snapshot's roles."""
+    counts = defaultdict(int)
+    occurrences = {}
+    for role, rate in roles:
+        counts[role] += 1
+        occurrences[(role, counts[role])] = rate
+    return occurrences
+
+
+def version_history(groups, snapshots):
+    """How each version family changed from tab to tab.
+
+    Returns {stem: [entry, ...]} in group_versions order. Every entry has
+    tab, date and grand_total. The first entry of a family also has its
+    section bid totals ("sections") and labor [role, unit_rate] rows
+    ("roles") in full; each later entry has only the changes from the one
+    before: section_changes {section: [old, new]} (None where a section is
+    absent), roles_added and roles_removed (one name per row gained or
+    lost), and rate_changes [[role, occurrence, old, new], ...]. Rows are
+    matched by role name and occurrence, so the second "Brand Ambassador"
+    row is compared with the second one of the previous tab.
+    """
+    history = {}
+    for stem, versions in groups.items():
+        entries = []
+        previous = None
+        for version in versions:
+            snap = snapshots[version["tab"]]
+            entry = {"tab": version["tab"], "date": version["date"],
+                     "grand_total": snap["grand_total"]}
+            if previous is None:
+                entry["sections"] = snap["sections"]
+                entry["roles"] = snap["roles"]
+            else:
+                old_sections, new_sections = previous["sections"], snap["sections"]
+                entry["section_changes"] = {
+                    name: [old_sections.get(name), new_sections.get(name)]
+                    for name in {**old_sections, **new_sections}
+                    if name not in old_sections or name not in new_sections
+                    or old_sections[name] != new_sections[name]
+                }
+                old_roles = role_occurrences(previous["roles"])
+                new_roles = role_occurrences(snap["roles"])
+                entry["roles_added"] = [role for role, n in new_roles if (role, n) not in old_roles]
+                entry["roles_removed"] = [role for role, n in old_roles
+                                          if (role, n) not in new_roles]
+                entry["rate_changes"] = [[role, n, old_roles[(role, n)], rate]
+                                         for (role, n), rate in new_roles.items()
+                                         if (role, n) in old_roles and old_roles[(role, n)] != rate]
+            entries.append(entry)
+            previous = snap
+        history[stem] = entries
+    return history
+
+
+def limit_error(error_type, message):
+    """Error fields for a scan stopped by a resource limit ("timeout" or "oom")."""
+    return {"error": message, "error_type": error_type}
+
+
+def scan_file(filepath, filename, reader="openpyxl", bounded=False, profile=False,
+              trace_memory=False, count_skip_tabs=True):
+    """Scan a single xlsx file and extract all data.
+
+    reader picks the workbook backend from READERS ("openpyxl" or "xml");
+    bounded loads only the region extraction reads (see load_sheet_data).
+    profile adds a "profile" entry from PhaseProfiler to the result.
+    count_skip_tabs=False records None as the row count of SKIP_TABS.
+    """
     result = {"filename": filename, "error": None}
+    profiler = PhaseProfiler(trace_memory) if profile else NULL_PROFILER
 
     try:
-        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        book = READERS[reader](filepath)
+    except MemoryError:
+        result.update(limit_error("oom", "Out of memory opening workbook"))
+        book = None
     except Exception as e:
         result["error"] = str(e)
+        book = None
+    if book is None:
+        if profile:
+            profiler.lap("open")
+            result["profile"] = profiler.report()
         return result
 
     try:
-        sheet_names = wb.sheetnames
+        sheet_names = book.sheetnames
         result["sheet_names"] = sheet_names
-
-        # Sheet row counts
+        profiler.lap("open")
+
+        # Load every sheet exactly once. In read_only mode each iteration
+        # re-parses the sheet XML, so row counts, format detection and
+        # extraction all share this pass. SKIP_TABS are only counted, and
+        # Template tabs only load the window format detection reads from them.
+        # Each grid is reduced to what the results need before the next
+        # sheet loads (format evidence, line items, a summary of the best
+        # main-tab candidate so far, and a snapshot of each version tab),
+        # so at most one grid is held.
+        client_tabs = [n for n in sheet_names if n not in SKIP_TABS and "Template" not in n]
+        version_tabs = version_tab_names(sheet_names)
+        version_set = set(version_tabs)
+        version_groups = group_versions(sheet_names)
+        snapshots = {}
+        check_gl = needs_gl_check(sheet_names)
+        gl_codes_found = format_b_found = False
         sheet_row_counts = {}
+        line_items = []
+        main_tab = None
+        main_summary = None
+        fallback_summary = None
+        best_grand_total = 0
         for name in sheet_names:
-            ws = wb[name]
-            count = 0
-            for _ in ws.iter_rows(values_only=True):
-                count += 1
-            sheet_row_counts[name] = count
+            if name in SKIP_TABS and not count_skip_tabs:
+                sheet_row_counts[name] = None
+                continue
+            window = FORMAT_B_WINDOW if "Template" in name else None
+            grid, row_count = load_sheet_data(book, name, keep_grid=name not in SKIP_TABS,
+                                              bounded=bounded, window=window)
+            sheet_row_counts[name] = row_count
+            if grid is None:
+                profiler.lap("row_count")
+                continue
+            profiler.lap("load_grid", sum(map(len, grid.rows)) if profile else 0)
+
+            format_b_found = format_b_found or has_format_b_keywords(grid)
+            if "Template" in name:
+                profiler.lap("detect_format")
+                continue
+            gl_codes_found = gl_codes_found or (check_gl and has_gl_codes(grid))
+            profiler.lap("detect_format")
+
+            # Main tab: the client tab with sections and the highest grand total
+            max_row = grid.max_row
+            raw_sections = find_sections(grid, max_row)
+            best_so_far = False
+            if raw_sections:
+                gt = find_grand_total(grid, max_row)
+                gt_val = gt if gt and gt > 0 else 0
+                best_so_far = gt_val > best_grand_total or main_tab is None
+                if best_so_far:
+                    best_grand_total = gt_val
+                    main_tab = name
+            profiler.lap("sections")
+            summary = None
+            if best_so_far:
+                summary = main_summary = summarize_main_tab(grid, raw_sections)
+            elif not raw_sections and name == client_tabs[0]:
+                # No sections here; used for financials if no tab has any
+                summary = fallback_summary = summarize_main_tab(grid, {})
+            if name in version_set:
+                snapshots[name] = version_snapshot(summary or summarize_main_tab(grid, raw_sections))
+            profiler.lap("row_sweep")
+
+            line_items.extend(extract_line_items(grid, name, "FORMAT_A"))
+            profiler.lap("line_items")
+            grid = None
         result["sheet_row_counts"] = sheet_row_counts
 
-        # Detect format
-        fmt = detect_format(wb, sheet_names)
+        fmt = classify_format(sheet_names, gl_codes_found, format_b_found)
         result["format"] = fmt
-
-        # Client tabs (not Overview, Templates, ROS, Labor Log, Template, Run of Show)
-        client_tabs = [n for n in sheet_names if n not in SKIP_TABS and "Template" not in n]
         result["client_tabs"] = client_tabs
 
         # Multi-version detection
-        version_tabs = detect_versions(sheet_names)
         result["version_tabs"] = version_tabs
-
-        # Find the client tab with the highest grand total (actual data)
-        main_grid = None
-        main_max_row = 0
-        main_tab = None
-        sections = {}
-        best_grand_total = 0
-
-        for tab_name in client_tabs:
-            ws = wb[tab_name]
-            grid = load_grid(ws)
-            max_row = max((r for r, c in grid.keys()), default=0) if grid else 0
-            raw_sections = find_sections(grid, max_row)
-            if not raw_sections:
-                continue
-            gt = find_grand_total(grid, max_row)
-            gt_val = gt if gt and gt > 0 else 0
-            if gt_val > best_grand_total or main_grid is None:
-                best_grand_total = gt_val
-                main_grid = grid
-                main_max_row = max_row
-                main_tab = tab_name
-                sections = find_section_totals(grid, raw_sections, max_row, fmt)
-
+        result["version_groups"] = version_groups
+        result["version_history"] = version_history(version_groups, snapshots)
         result["main_tab"] = main_tab
 
-        if main_grid is not None:
-            result["sections"] = sections
-            result["grand_total"] = find_grand_total(main_grid, main_max_row)
-
-            if fmt == "FORMAT_A":
-                result["financials"] = extract_financials_a(main_grid)
-            elif fmt == "FORMAT_B":
-                result["financials"] = extract_financials_b(main_grid)
-            else:
-                result["financials"] = {}
-
-            result["labor_roles"] = extract_labor_roles(main_grid, sections, fmt)
-            result["has_recap_data"] = check_recap_data(main_grid)
-        elif client_tabs:
-            # No sections found, use first client tab for financials anyway
-            ws = wb[client_tabs[0]]
-            grid = load_grid(ws)
-            max_row = max((r for r, c in grid.keys()), default=0) if grid else 0
-            result["sections"] = {}
-            result["grand_total"] = find_grand_total(grid, max_row)
-
-            if fmt == "FORMAT_A":
-                result["financials"] = extract_financials_a(grid)
-            elif fmt == "FORMAT_B":
-                result["financials"] = extract_financials_b(grid)
-            else:
-                result["financials"] = {}
-
-            result["labor_roles"] = []
-            result["has_recap_data"] = check_recap_data(grid)
+        if fmt != "FORMAT_A":
+            for item in line_items:
+                item[4] = None  # GL codes are FORMAT_A only
+        result["line_items"] = line_items
+
+        summary = main_summary or fallback_summary
+        if summary is not None:
+            summary = finish_main_tab(summary, fmt)
+            result["sections"] = summary["sections"] if main_summary else {}
+            result["grand_total"] = summary["grand_total"]
+            result["financials"] = summary["financials"]
+            result["labor_roles"] = summary["labor_roles"]
+            result["has_recap_data"] = summary["has_recap_data"]
         else:
             result["sections"] = {}
             result["grand_total"] = None
@@ -402,15 +1344,362 @@ def scan_file(filepath, filename):
             result["labor_roles"] = []
             result["has_recap_data"] = False
 
+    except MemoryError:
+        # Drop the half-built result; the grid being loaded is what ran out
+        result = {"filename": filename, **limit_error("oom", "Out of memory during scan")}
     except Exception as e:
         result["error"] = str(e)
         result["error_traceback"] = traceback.format_exc()
     finally:
-        wb.close()
+        book.close()
 
+    if profile:
+        result["profile"] = profiler.report()
     return result
 
 
+def file_hash(filepath):
+    """SHA-256 hex digest of a file's contents, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest_hashes(path=MANIFEST):
+    """{filename: (size, mtime_ns, sha256)} from the download manifest, or {} without one."""
+    try:
+        with open(path) as f:
+            files = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {filename: (entry["size"], entry["mtime_ns"], entry["sha256"])
+            for filename, entry in files.items()}
+
+
+def known_hash(filepath, filename, manifest):
+    """The file's SHA-256: from manifest while its size and mtime match, else read it.
+
+    Returns (digest, from_manifest).
+    """
+    entry = manifest.get(filename)
+    if entry:
+        stat = os.stat(filepath)
+        if (stat.st_size, stat.st_mtime_ns) == entry[:2]:
+            return entry[2], True
+    return file_hash(filepath), False
+
+
+def cache_path(digest):
+    return os.path.join(CACHE_DIR, digest + ".json")
+
+
+def load_cached_result(digest):
+    """Return the cached result (without filename) for a content hash."""
+    with open(cache_path(digest)) as f:
+        return json.load(f)
+
+
+def save_cached_result(digest, result):
+    """Cache a result atomically so an interrupted run never leaves a torn entry."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(digest)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({k: v for k, v in result.items() if k not in ("filename", "profile")}, f,
+                  default=str)
+    os.replace(tmp_path, path)
+
+
+def cacheable(result):
+    """Whether a fresh scan result may be cached for runs with other options.
+
+    Errors, results without SKIP_TABS counts and --bounded results would be
+    incomplete for a full run, so they are never cached.
+    """
+    return not result.get("error") and not SKIP_TAB_COUNTS and not BOUNDED
+
+
+def prune_scan_cache(keep):
+    """Remove other extractor versions and entries whose hash is not in keep."""
+    if not os.path.isdir(CACHE_ROOT):
+        return
+    for version_dir in os.listdir(CACHE_ROOT):
+        path = os.path.join(CACHE_ROOT, version_dir)
+        if path != CACHE_DIR:
+            shutil.rmtree(path, ignore_errors=True)
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name[:-len(".json")] not in keep:
+            os.remove(os.path.join(CACHE_DIR, name))
+
+
+def checkpoint_options():
+    """Settings that change scan output; a checkpoint only resumes a run that matches."""
+    return {"extractor_version": EXTRACTOR_VERSION, "reader": READER, "bounded": BOUNDED,
+            "skip_tab_counts": SKIP_TAB_COUNTS}
+
+
+def save_checkpoint(completed, hashes, elapsed):
+    """Record completed filenames (with content hashes) atomically."""
+    checkpoint = {
+        "options": checkpoint_options(),
+        "completed": [[filename, hashes[filename]] for filename in completed],
+        "elapsed_seconds": round(elapsed, 1),
+    }
+    tmp_path = CHECKPOINT + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT)
+
+
+def load_checkpoint(files, hashes):
+    """Return (done, elapsed): how many leading files keep their checkpointed results.
+
+    Results are always written in filename order, so the completed files are a
+    prefix of files. The prefix stops at the first file that was added, removed
+    or changed since the checkpoint. The partial output is truncated to that
+    prefix, dropping anything written after the last checkpoint.
+    """
+    if not os.path.exists(CHECKPOINT) or not os.path.exists(PARTIAL_OUTPUT):
+        print("No checkpoint found, starting from the first file")
+        return 0, 0.0
+    with open(CHECKPOINT) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("options") != checkpoint_options():
+        print(f"Checkpoint options {checkpoint.get('options')} do not match this run, starting over")
+        return 0, 0.0
+
+    done = 0
+    for (filename, digest), current in zip(checkpoint["completed"], files):
+        if filename != current or digest != hashes[current]:
+            break
+        done += 1
+
+    with open(PARTIAL_OUTPUT, "rb+") as f:
+        for _ in range(done):
+            f.readline()
+        f.truncate(f.tell())
+    print(f"Resuming: {done} of {len(checkpoint['completed'])} checkpointed files still valid")
+    return done, checkpoint["elapsed_seconds"]
+
+
+def write_dedup_report(files, hashes):
+    """Write dedup_report.json: groups of filenames with identical content.
+
+    Returns the set of digests shared by more than one file.
+    """
+    groups = defaultdict(list)
+    for filename in files:
+        groups[hashes[filename]].append(filename)
+    shared = {digest: names for digest, names in groups.items() if len(names) > 1}
+
+    report_groups = []
+    for digest, names in sorted(shared.items(), key=lambda item: (-len(item[1]), item[1][0])):
+        size = os.path.getsize(os.path.join(INPUT_DIR, names[0]))
+        report_groups.append({
+            "sha256": digest,
+            "size_bytes": size,
+            "scanned_as": names[0],
+            "filenames": names,
+        })
+    report = {
+        "total_files": len(files),
+        "unique_contents": len(groups),
+        "duplicate_files": len(files) - len(groups),
+        "duplicate_bytes": sum(g["size_bytes"] * (len(g["filenames"]) - 1) for g in report_groups),
+        "groups": report_groups,
+    }
+    with open(DEDUP_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    return set(shared)
+
+
+def scan_job(job):
+    """Pool entry point: job is a (filepath, filename) tuple. Returns (result, seconds)."""
+    filepath, filename = job
+    start = time.time()
+    result = scan_file(filepath, filename, READER, BOUNDED, PROFILE, PROFILE_MEMORY,
+                       not SKIP_TAB_COUNTS)
+    return result, time.time() - start
+
+
+def iter_scans(jobs, workers):
+    """Yield (result, seconds) for jobs in input order, using a process pool if workers > 1."""
+    if TIMEOUT or MAX_MEMORY_MB:
+        yield from iter_isolated_scans(jobs, workers, TIMEOUT, MAX_MEMORY_MB)
+        return
+    if workers <= 1:
+        for job in jobs:
+            yield scan_job(job)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        # imap keeps input order, so the merged output is deterministic
+        yield from pool.imap(scan_job, jobs)
+
+
+def isolated_scan(conn, job, max_memory_mb):
+    """Process entry point for iter_isolated_scans: scan one job under a memory ceiling."""
+    if max_memory_mb:
+        import resource  # Unix only, so imported just when a ceiling is asked for
+        limit = max_memory_mb << 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    result, seconds = scan_job(job)
+    if "profile" in result:
+        result["profile"]["peak_rss_mb"] = peak_rss_mb()
+    conn.send((result, seconds))
+    conn.close()
+
+
+def iter_isolated_scans(jobs, workers, timeout, max_memory_mb):
+    """Yield (result, seconds) in input order, running each scan in its own process.
+
+    Up to workers scans run at once. A scan still running after timeout seconds
+    is killed and reported as a "timeout" error. A scan that hits the memory
+    ceiling reports an "oom" error itself; one killed outright by SIGKILL (the
+    kernel OOM killer) is reported as "oom" too, and any other dead worker as
+    a "crash". A slow file holds back output order, so at most 4 * workers
+    results are buffered ahead of it.
+    """
+    pending = iter(enumerate(jobs))
+    running = {}  # receiving connection -> (index, filename, process, started)
+    finished = {}
+    next_index = 0
+    last_started = -1
+
+    def finish(conn, result):
+        index, _, process, started = running.pop(conn)
+        conn.close()
+        process.join()
+        finished[index] = (result, time.time() - started)
+
+    while next_index < len(jobs):
+        while len(running) < workers and last_started < next_index + 4 * workers:
+            item = next(pending, None)
+            if item is None:
+                break
+            last_started, job = item
+            recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=isolated_scan,
+                                              args=(send_conn, job, max_memory_mb))
+            process.start()
+            send_conn.close()
+            running[recv_conn] = (last_started, job[1], process, time.time())
+
+        wait_seconds = None
+        if timeout:
+            oldest = min(started for _, _, _, started in running.values())
+            wait_seconds = max(0.0, oldest + timeout - time.time())
+        for conn in multiprocessing.connection.wait(list(running), wait_seconds):
+            filename, process = running[conn][1:3]
+            try:
+                result, _ = conn.recv()
+            except EOFError:
+                process.join()
+                if process.exitcode == -9:
+                    error = limit_error("oom", "Scan process killed (SIGKILL), likely out of memory")
+                else:
+                    error = limit_error("crash", f"Scan process exited with code {process.exitcode}")
+                result = {"filename": filename, **error}
+            finish(conn, result)
+
+        if timeout:
+            now = time.time()
+            for conn, (_, filename, process, started) in list(running.items()):
+                if now - started >= timeout:
+                    process.kill()
+                    finish(conn, {"filename": filename,
+                                  **limit_error("timeout", f"Scan timed out after {timeout:g}s")})
+
+        while next_index in finished:
+            yield finished.pop(next_index)
+            next_index += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+PROFILE_MEMORY_KEYS = ("peak_mb", "peak_rss_mb")  # per file, only when recorded
+
+
+def profile_value(profile, key):
+    """Sort key for --profile-sort: total, cells, peak_mb, peak_rss_mb, or a phase's seconds."""
+    if key in ("total", "cells") + PROFILE_MEMORY_KEYS:
+        return profile.get(key, 0.0)
+    return profile["phases"].get(key, {}).get("seconds", 0.0)
+
+
+def print_profile_report(profiles, sort_key):
+    """Percentiles per phase across files, then the worst files by sort_key."""
+    phases = []
+    for _, profile in profiles:
+        for phase in profile["phases"]:
+            if phase not in phases:
+                phases.append(phase)
+
+    print(f"\n--- PHASE PROFILE ({len(profiles)} files) ---")
+    print(f"{'phase':14s} {'p50 s':>8s} {'p90 s':>8s} {'p99 s':>8s} {'max s':>8s} "
+          f"{'total s':>9s} {'cells':>11s} {'peak MB':>8s}")
+    for phase in phases + ["total"]:
+        stats = [p["phases"].get(phase, {}) for _, p in profiles]
+        if phase == "total":
+            seconds = sorted(p["total"] for _, p in profiles)
+            cells = sum(p["cells"] for _, p in profiles)
+            peak = max(p.get("peak_mb", 0.0) for _, p in profiles)
+        else:
+            seconds = sorted(st.get("seconds", 0.0) for st in stats)
+            cells = sum(st.get("cells", 0) for st in stats)
+            peak = max((st.get("peak_mb", 0.0) for st in stats), default=0.0)
+        print(f"{phase:14s} {percentile(seconds, 50):8.3f} {percentile(seconds, 90):8.3f} "
+              f"{percentile(seconds, 99):8.3f} {seconds[-1]:8.3f} {sum(seconds):9.2f} "
+              f"{cells:11d} {peak:8.1f}")
+    print("(peak MB: traced Python allocations with --profile-memory)")
+    if any("peak_rss_mb" in p for _, p in profiles):
+        rss = sorted(p["peak_rss_mb"] for _, p in profiles)
+        print(f"Scan process peak RSS MB: p50 {percentile(rss, 50):.1f}, "
+              f"p90 {percentile(rss, 90):.1f}, max {rss[-1]:.1f}")
+
+    recorded = [k for k in PROFILE_MEMORY_KEYS if any(k in p for _, p in profiles)]
+    keys = ["total", "cells"] + recorded + phases
+    if sort_key not in keys:
+        print(f"Unknown --profile-sort {sort_key!r}; choose from {', '.join(keys)}")
+        sort_key = "total"
+    print(f"\nWorst files by {sort_key}:")
+    ranked = sorted(profiles, key=lambda item: profile_value(item[1], sort_key), reverse=True)
+    for fn, profile in ranked[:SLOWEST_COUNT]:
+        print(f"  {profile_value(profile, sort_key):>12g}  {fn[:80]}")
+
+
+def compare_readers(files):
+    """Scan files with every reader, reporting timings and any output mismatches."""
+    timings = defaultdict(float)
+    mismatches = []
+    for filename in files:
+        filepath = os.path.join(INPUT_DIR, filename)
+        outputs = {}
+        for reader in READERS:
+            start = time.time()
+            result = scan_file(filepath, filename, reader, BOUNDED)
+            timings[reader] += time.time() - start
+            result.pop("error_traceback", None)
+            outputs[reader] = json.dumps(result, default=str)
+        if len(set(outputs.values())) > 1:
+            mismatches.append(filename)
+
+    print(f"\n--- READER COMPARISON ({len(files)} files) ---")
+    base = timings["openpyxl"]
+    for reader, seconds in timings.items():
+        speedup = base / seconds if seconds > 0 else 0
+        print(f"  {reader:10s} {seconds:8.2f}s  ({speedup:.2f}x vs openpyxl)")
+    print(f"Mismatches: {len(mismatches)}")
+    for fn in mismatches[:20]:
+        print(f"  {fn}")
+
+
 def main():
     files = sorted([f for f in os.listdir(INPUT_DIR) if f.endswith(".xlsx")])
     print(f"Found {len(files)} xlsx files to scan")
@@ -419,59 +1708,199 @@ def main():
         files = files[:TEST_COUNT]
         print(f"TEST MODE: scanning first {TEST_COUNT} files")
 
+    if COMPARE_READERS:
+        compare_readers(files)
+        return
+
+    manifest = load_manifest_hashes()
+    hashes = {}
+    from_manifest = 0
+    for filename in files:
+        hashes[filename], known = known_hash(os.path.join(INPUT_DIR, filename), filename, manifest)
+        from_manifest += known
+    if manifest:
+        print(f"Hashes: {from_manifest} from the download manifest, "
+              f"{len(files) - from_manifest} read")
+    if RESUME:
+        done, prior_elapsed = load_checkpoint(files, hashes)
+    else:
+        if os.path.exists(CHECKPOINT):
+            print("Discarding checkpoint from an earlier run (pass --resume to continue it)")
+        done, prior_elapsed = 0, 0.0
+
+    shared_digests = write_dedup_report(files, hashes)
+    unique = len(set(hashes.values()))
+    print(f"Dedup: {len(files) - unique} duplicate files in {len(shared_digests)} groups "
+          f"-> {DEDUP_REPORT}")
+
+    # Only new or changed workbooks are scanned, once per distinct content;
+    # the rest come from the cache or an identical file's result
+    jobs = []
+    resumed_digests = set()
+    for filename in files[:done]:
+        digest = hashes[filename]
+        if digest not in resumed_digests and not os.path.exists(cache_path(digest)):
+            jobs.append((os.path.join(INPUT_DIR, filename), filename))
+        resumed_digests.add(digest)
+    rescans = len(jobs)
+    seen = set(resumed_digests)
+    for filename in files[done:]:
+        digest = hashes[filename]
+        if digest in seen:
+            continue
+        seen.add(digest)
+        if NO_CACHE or not os.path.exists(cache_path(digest)):
+            jobs.append((os.path.join(INPUT_DIR, filename), filename))
+    print(f"Cache: {len(seen) - len(resumed_digests) - len(jobs) + rescans} unchanged, "
+          f"{len(jobs) - rescans} to scan")
+    if rescans:
+        print(f"Rescanning {rescans} resumed files for line items missing from the cache")
+
+    workers = min(WORKERS, len(jobs)) or 1
+    if workers > 1:
+        print(f"Scanning with {workers} worker processes")
+
+    # Every result lands in the partial file as it completes; JSON mode also
+    # collects them for one dump, JSONL mode promotes the partial file at the end
     results = []
+    resumed = open(PARTIAL_OUTPUT) if done else None
+    partial = open(PARTIAL_OUTPUT, "a" if done else "w")
     errors = []
     format_counts = defaultdict(int)
+    with_sections = with_labor = with_recap = total_roles = 0
+    scan_times = []  # (seconds, filename) for files scanned in this run
+    profiles = []  # (filename, profile) for results carrying --profile numbers
     start_time = time.time()
+    scanned = iter_scans(jobs, workers)
+
+    to_scan = {filename for _, filename in jobs}
+
+    # digest -> result without filename, for content shared by several files
+    shared_results = {}
+    resumed_items = {}  # digest -> line items rescanned for resumed files
+    line_item_store = LineItemWriter()
 
     for i, filename in enumerate(files, 1):
-        filepath = os.path.join(INPUT_DIR, filename)
-        result = scan_file(filepath, filename)
-        results.append(result)
+        digest = hashes[filename]
+        if i <= done:
+            result = json.loads(resumed.readline())
+            if i == done:
+                resumed.close()
+            # The partial file has no line items; take them from the cache,
+            # or from a rescan when the result was never cached
+            if filename in to_scan:
+                rescanned, seconds = next(scanned)
+                scan_times.append((seconds, filename))
+                if cacheable(rescanned):
+                    save_cached_result(digest, rescanned)
+                resumed_items[digest] = rescanned.get("line_items", [])
+            if digest in resumed_items:
+                result["line_items"] = resumed_items[digest]
+            else:
+                result["line_items"] = load_cached_result(digest).get("line_items", [])
+        elif digest in shared_results:
+            result = {"filename": filename, **shared_results[digest]}
+        elif filename in to_scan:
+            result, seconds = next(scanned)
+            scan_times.append((seconds, filename))
+            if cacheable(result):
+                save_cached_result(hashes[filename], result)
+        else:
+            result = {"filename": filename, **load_cached_result(hashes[filename])}
+        if digest in shared_digests and digest not in shared_results:
+            shared_results[digest] = {k: v for k, v in result.items()
+                                      if k not in ("filename", "profile")}
+        line_item_store.add(filename, result.pop("line_items", None) or [],
+                            result.get("main_tab"))
+
+        if i > done:
+            partial.write(json.dumps(result, default=str) + "\n")
+            partial.flush()
+        if not JSONL:
+            results.append(result)
 
         if result.get("error"):
-            errors.append((filename, result["error"]))
+            errors.append((filename, result["error"], result.get("error_type")))
         else:
             format_counts[result.get("format", "UNKNOWN")] += 1
+        with_sections += bool(result.get("sections"))
+        with_labor += bool(result.get("labor_roles"))
+        with_recap += bool(result.get("has_recap_data"))
+        total_roles += len(result.get("labor_roles", []))
+        if "profile" in result:
+            profiles.append((filename, result["profile"]))
+
+        if i > done and (i % CHECKPOINT_EVERY == 0 or i == len(files)):
+            save_checkpoint(files[:i], hashes, prior_elapsed + time.time() - start_time)
 
-        if i % 50 == 0 or TEST_MODE:
+        if i > done and (i % 50 == 0 or TEST_MODE):
             elapsed = time.time() - start_time
-            rate = i / elapsed if elapsed > 0 else 0
+            rate = (i - done) / elapsed if elapsed > 0 else 0
             print(f"[{i}/{len(files)}] {rate:.1f} files/sec — {filename[:60]}")
 
-    elapsed = time.time() - start_time
+    line_item_store.close()
+    elapsed = prior_elapsed + time.time() - start_time
+    error_types = defaultdict(int)
+    for _, _, error_type in errors:
+        if error_type:
+            error_types[error_type] += 1
 
-    output = {
-        "total_scanned": len(results),
+    # Drop entries for workbooks no longer in the corpus (test runs see only a few)
+    if not TEST_MODE:
+        prune_scan_cache(set(hashes.values()))
+
+    summary = {
+        "total_scanned": len(files),
         "errors": len(errors),
         "format_counts": dict(format_counts),
         "elapsed_seconds": round(elapsed, 1),
-        "results": results,
     }
 
-    with open(OUTPUT, "w") as f:
-        json.dump(output, f, indent=2, default=str)
+    if JSONL:
+        partial.write(json.dumps({"record": "summary", **summary}) + "\n")
+        partial.close()
+        os.replace(PARTIAL_OUTPUT, OUTPUT_JSONL)
+        output_path = OUTPUT_JSONL
+    else:
+        with open(OUTPUT, "w") as f:
+            json.dump({**summary, "results": results}, f, indent=2, default=str)
+        partial.close()
+        os.remove(PARTIAL_OUTPUT)
+        output_path = OUTPUT
+    if os.path.exists(CHECKPOINT):
+        os.remove(CHECKPOINT)
 
     print(f"\n--- RESULTS ---")
-    print(f"Scanned: {len(results)} files in {elapsed:.1f}s")
+    print(f"Scanned: {len(files)} files in {elapsed:.1f}s")
     print(f"Format counts: {dict(format_counts)}")
     print(f"Errors: {len(errors)}")
+    if error_types:
+        print(f"Limit breaches: {dict(error_types)}")
     if errors:
         print("Error files:")
-        for fn, err in errors[:10]:
-            print(f"  {fn}: {err[:100]}")
-    print(f"Output: {OUTPUT}")
+        for fn, err, error_type in errors[:10]:
+            label = f"[{error_type}] " if error_type else ""
+            print(f"  {fn}: {label}{err[:100]}")
+    print(f"Output: {output_path}")
+    print(f"Line items: {line_item_store.rows} -> {line_item_store.store_dir}")
 
     # Quick stats
-    with_sections = sum(1 for r in results if r.get("sections"))
-    with_labor = sum(1 for r in results if r.get("labor_roles"))
-    with_recap = sum(1 for r in results if r.get("has_recap_data"))
-    total_roles = sum(len(r.get("labor_roles", [])) for r in results)
     print(f"\nFiles with sections: {with_sections}")
     print(f"Files with labor roles: {with_labor}")
     print(f"Files with recap data: {with_recap}")
     print(f"Total labor role rows across all files: {total_roles}")
 
+    if scan_times:
+        seconds = sorted(t for t, _ in scan_times)
+        print(f"\n--- SLOWEST FILES ({len(seconds)} scanned, "
+              f"median {percentile(seconds, 50):.2f}s, p95 {percentile(seconds, 95):.2f}s, "
+              f"max {seconds[-1]:.2f}s) ---")
+        for t, fn in sorted(scan_times, reverse=True)[:SLOWEST_COUNT]:
+            print(f"  {t:7.2f}s  {fn[:80]}")
+
+    if profiles:
+        print_profile_report(profiles, PROFILE_SORT)
+
 
 if __name__ == "__main__":
     main()
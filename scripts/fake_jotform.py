@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Local stand-in for the JotForm upload server, for exercising download_estimates.py.
+
+FakeJotform serves in-memory .xlsx payloads over HTTP on 127.0.0.1 from a
+background thread, optionally adding latency per request, and records
+when each request arrived and how many were in flight at once. It honours
+"Range: bytes=N-" requests unless their If-Range no longer matches, sends
+an ETag and Last-Modified with every file and answers a matching
+If-None-Match with 304 Not Modified. Files
+named in flaky have their first response cut off halfway through the body.
+
+Run directly, it serves a generated set of payloads (some byte-identical,
+some flaky, plus one missing file) into a directory that already holds a
+complete .xlsx saved before the manifest, a truncated .xlsx, a
+half-finished .part, a .part of an older version of its
+file and a .part with no saved validator, downloads them with
+download_files and checks that every file arrived intact with no .part
+left over, duplicates were hard-linked, cut-off transfers were resumed
+with Range requests, the missing file failed, and the concurrency and
+rate limits held, and the complete .xlsx got a manifest entry without
+validators. It then changes one payload and refreshes: only that file and
+the one without validators may be transferred again, and the manifest must
+record the new hash.
+Last, a new URL serving a copy of a file from the first run must be
+hard-linked to it.
+
+Usage:
+    python scripts/fake_jotform.py [--files N] [--latency SECONDS]
+        [--workers N] [--rate R] [--host-concurrency N] [--host-rate R]
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+import openpyxl
+
+import download_estimates as de
+
+UPLOAD_PATH = "/uploads/estimates/"
+
+
+def etag(body):
+    return '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+
+
+def fake_xlsx(n):
+    """A small, valid workbook whose bytes differ for each n."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"Client Event {n}"
+    ws.append(["EVENT ESTIMATE", n])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class FakeJotform:
+    """Serve payloads ({filename: bytes}) at UPLOAD_PATH + filename until stop()."""
+
+    def __init__(self, payloads, latency=0.0, flaky=()):
+        self.payloads = payloads
+        self.latency = latency
+        self.flaky = set(flaky)
+        self.range_requests = 0
+        self.transfers = 0  # 200 and 206 responses
+        self.last_modified = formatdate(usegmt=True)
+        self.arrivals = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{UPLOAD_PATH}"
+
+    def url(self, filename):
+        return self.base_url + quote(filename)
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the client's pool is used
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.arrivals.append(time.monotonic())
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    time.sleep(fake.latency)
+                    name = unquote(self.path[len(UPLOAD_PATH):])
+                    body = fake.payloads.get(name)
+                    if body is None:
+                        self.send_error(404)
+                        return
+                    tag = etag(body)
+                    if self.headers.get("If-None-Match") == tag:
+                        self.send_response(304)
+                        self.send_header("ETag", tag)
+                        self.end_headers()
+                        return
+                    with fake.lock:
+                        fake.transfers += 1
+                    start = 0
+                    requested = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+                    if_range = self.headers.get("If-Range")
+                    if if_range and if_range not in (tag, fake.last_modified):
+                        requested = None  # changed since the client's part began
+                    if requested:
+                        start = int(requested.group(1))
+                        if start >= len(body):
+                            self.send_error(416)
+                            return
+                        with fake.lock:
+                            fake.range_requests += 1
+                        self.send_response(206)
+                        self.send_header("Content-Range",
+                                         f"bytes {start}-{len(body) - 1}/{len(body)}")
+                    else:
+                        self.send_response(200)
+                    self.send_header("Content-Type", "application/vnd.openxmlformats-"
+                                     "officedocument.spreadsheetml.sheet")
+                    self.send_header("Content-Length", str(len(body) - start))
+                    self.send_header("ETag", tag)
+                    self.send_header("Last-Modified", fake.last_modified)
+                    self.end_headers()
+                    with fake.lock:
+                        cut = name in fake.flaky
+                        fake.flaky.discard(name)
+                    if cut:
+                        # Announce the full length, send half, drop the connection
+                        self.wfile.write(memoryview(body)[start:start + (len(body) - start) // 2])
+                        self.close_connection = True
+                        return
+                    self.wfile.write(memoryview(body)[start:])
+                finally:
+                    with fake.lock:
+                        fake.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def peak_rate(self, window=1.0):
+        """Most requests that arrived within any window seconds."""
+        times = sorted(self.arrivals)
+        peak = start = 0
+        for end, t in enumerate(times):
+            while t - times[start] > window:
+                start += 1
+            peak = max(peak, end - start + 1)
+        return peak
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def self_check(file_count, latency):
+    """Download a fake corpus with the configured limits; return a list of problems."""
+    payloads = {f"Estimate {n:03d}.xlsx": fake_xlsx(n) for n in range(file_count)}
+    names = sorted(payloads)
+    # Every tenth file re-uploaded under another name, byte for byte
+    copies = {f"Recap {name}": payloads[name] for name in names[::10]}
+    payloads.update(copies)
+    flaky = names[3::7]
+
+    # Fake workbooks are a few KB; small chunks let a cut-off transfer keep
+    # what arrived before the cut, as a multi-MB attachment would
+    de.CHUNK_SIZE = 512
+
+    fake = FakeJotform(payloads, latency, flaky)
+    out_dir = tempfile.mkdtemp(prefix="fake_jotform_")
+    problems = []
+    # Left behind by a killed run: a truncated file, a half-finished part,
+    # a part of a version since replaced upstream and a part whose
+    # validator was never saved
+    truncated, resumable, stale, unvalidated = names[1], names[2], names[4], names[6]
+    with open(os.path.join(out_dir, truncated), "wb") as f:
+        f.write(payloads[truncated][:100])
+    unrecorded = names[8]  # downloaded before there was a manifest
+    with open(os.path.join(out_dir, unrecorded), "wb") as f:
+        f.write(payloads[unrecorded])
+    old_version = fake_xlsx(file_count + 2)
+    for name, body, tag in ((resumable, payloads[resumable], etag(payloads[resumable])),
+                            (stale, old_version, etag(old_version)),
+                            (unvalidated, payloads[unvalidated], None)):
+        part = os.path.join(out_dir, name + de.PART_SUFFIX)
+        with open(part, "wb") as f:
+            f.write(body[:len(body) // 3])
+        if tag:
+            with open(de.part_validator_path(part), "w") as f:
+                json.dump({"url": fake.url(name), "if_range": tag}, f)
+    try:
+        urls = [(fake.url(name), name) for name in payloads]
+        urls.append((fake.url("Missing.xlsx"), "Missing.xlsx"))
+        start = time.perf_counter()
+        downloaded, failures, already_exists, duplicates = de.download_files(urls, out_dir)
+        seconds = time.perf_counter() - start
+
+        print(f"{len(urls)} URLs in {seconds:.2f}s: {downloaded} downloaded, "
+              f"{len(duplicates)} hard-linked, {len(failures)} failed, "
+              f"{fake.range_requests} resumed; "
+              f"peak {fake.max_in_flight} in flight, {fake.peak_rate()} requests in 1s")
+
+        for name, body in payloads.items():
+            path = os.path.join(out_dir, name)
+            if not os.path.exists(path):
+                problems.append(f"{name} missing")
+                continue
+            with open(path, "rb") as f:
+                if f.read() != body:
+                    problems.append(f"{name} corrupted")
+        leftovers = [f for f in os.listdir(out_dir)
+                     if f.endswith((de.PART_SUFFIX, de.PART_SUFFIX + de.PART_VALIDATOR_SUFFIX))]
+        if leftovers:
+            problems.append(f"part files left over: {leftovers}")
+        if fake.range_requests != len(flaky) + 1:
+            problems.append(f"expected {len(flaky) + 1} resumed transfers, "
+                            f"got {fake.range_requests}")
+        if len(duplicates) != len(copies):
+            problems.append(f"expected {len(copies)} duplicates, got {len(duplicates)}")
+        if [name for name, _ in failures] != ["Missing.xlsx"]:
+            problems.append(f"unexpected failures {failures}")
+        if fake.max_in_flight > min(de.WORKERS, de.HOST_CONCURRENCY):
+            problems.append(f"{fake.max_in_flight} requests in flight, "
+                            f"limit {min(de.WORKERS, de.HOST_CONCURRENCY)}")
+        rates = [r for r in (de.RATE, de.HOST_RATE) if r]
+        if rates:
+            # A full bucket's burst plus one second of refill
+            allowed = 2 * max(1, min(rates))
+            if fake.peak_rate() > allowed:
+                problems.append(f"{fake.peak_rate()} requests in 1s, limit {allowed}")
+
+        entry = de.load_manifest(os.path.join(out_dir, de.MANIFEST_NAME)).get(unrecorded, {})
+        if entry.get("sha256") != hashlib.sha256(payloads[unrecorded]).hexdigest():
+            problems.append(f"no manifest hash for {unrecorded}, already on disk")
+        elif entry["etag"] is not None:
+            problems.append(f"{unrecorded} recorded with validators it never got")
+
+        # One estimate re-uploaded behind the same URL, then a refresh
+        changed = names[5]
+        payloads[changed] = fake_xlsx(file_count + 1)
+        transfers = fake.transfers
+        de.download_files(urls, out_dir, refresh=True)
+        refetched = fake.transfers - transfers
+        print(f"Refresh: {refetched} of {len(urls)} transferred again")
+        manifest = de.load_manifest(os.path.join(out_dir, de.MANIFEST_NAME))
+        if refetched != 2:  # changed, plus unrecorded for want of validators
+            problems.append(f"refresh transferred {refetched} files, expected 2")
+        with open(os.path.join(out_dir, changed), "rb") as f:
+            if f.read() != payloads[changed]:
+                problems.append(f"{changed} not refreshed")
+        if sorted(manifest) != sorted(payloads):
+            problems.append(f"manifest has {len(manifest)} files, expected {len(payloads)}")
+        elif manifest[changed]["sha256"] != hashlib.sha256(payloads[changed]).hexdigest():
+            problems.append(f"manifest hash of {changed} not updated")
+
+        # A copy of a file saved by the first run, uploaded later
+        late_copy = f"Late {names[7]}"
+        payloads[late_copy] = payloads[names[7]]
+        _, _, _, duplicates = de.download_files([(fake.url(late_copy), late_copy)], out_dir)
+        if duplicates != [(late_copy, names[7])]:
+            problems.append(f"copy of an earlier run's file not hard-linked: {duplicates}")
+    finally:
+        fake.stop()
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return problems
+
+
+def main():
+    file_count = int(de.arg_value("--files", "60"))
+    latency = float(de.arg_value("--latency", "0.05"))
+    problems = self_check(file_count, latency)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Download and scan estimates in one pipelined run.
+
+download_estimates.py hands each file to a bounded queue as soon as it is
+in place, and --scan-workers processes run extract_estimates.scan_file on
+queued files while the remaining downloads are still in flight. Scanners
+take a file only when one of them is free, so when they fall behind the
+queue fills, the downloader's on_complete callback blocks, and no further
+downloads are queued until they catch up.
+
+Scan results go to the scan cache, so the closing extract_estimates.py
+pass finds every file cached and only assembles scan_results.json, the
+line item store and the reports. Output is the same as running
+download_estimates.py and then extract_estimates.py; the two overlap
+instead of running back to back. The flags that keep scan results out of
+the cache (UNCACHED_FLAGS: --no-cache, --skip-tab-counts, --bounded) would
+make the closing pass parse every file a second time, so they are refused;
+run download_estimates.py and extract_estimates.py separately to use them.
+--timeout and --max-memory apply to pipelined scans as they do to
+extract_estimates.py: each scan runs in its own process under the limits.
+
+Usage:
+    python scripts/ingest_pipeline.py [--download-workers N] [--scan-workers N]
+        [--queue N] [--rate R] [--host-concurrency N] [--host-rate R]
+        [--host-limit HOST=N/R] [--refresh] [--from-parsed] [--newest-first]
+        [--reader openpyxl|xml] [--timeout SECONDS] [--max-memory MB] [--test]
+"""
+
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import download_estimates as de
+import extract_estimates as ee
+
+DOWNLOAD_WORKERS = max(1, int(ee.arg_value("--download-workers", str(de.DEFAULT_WORKERS))))
+SCAN_WORKERS = max(1, int(ee.arg_value("--scan-workers", str(os.cpu_count() or 1))))
+QUEUE_SIZE = max(1, int(ee.arg_value("--queue", "16")))
+DONE = None  # queued after the last file
+UNCACHED_FLAGS = ("--no-cache", "--skip-tab-counts", "--bounded")
+
+
+def scan_into_cache(filepath, filename, digest):
+    """Scanner process: cache the scan result for one file unless already cached.
+
+    digest is the file's SHA-256 when the downloader computed it. Returns
+    (filename, seconds, scanned, error).
+    """
+    if digest is None:
+        digest = ee.file_hash(filepath)
+    if os.path.exists(ee.cache_path(digest)):
+        return filename, 0.0, False, None
+    # iter_scans applies --timeout/--max-memory like extract_estimates.py does
+    result, seconds = next(ee.iter_scans([(filepath, filename)], 1))
+    if ee.cacheable(result):
+        ee.save_cached_result(digest, result)
+    return filename, seconds, True, result.get("error")
+
+
+def ingest(urls, output_dir, download_workers=DOWNLOAD_WORKERS, scan_workers=SCAN_WORKERS,
+           queue_size=QUEUE_SIZE, test_mode=False):
+    """Download urls into output_dir while scanning finished files into the scan cache.
+
+    Returns a stats dict: download_files' results under "download", counts
+    of files scanned, already cached and failed to scan, and the seconds
+    until the last download and the last scan finished.
+    """
+    files = queue.Queue(maxsize=queue_size)
+    stats = {"scanned": 0, "cached": 0, "scan_errors": [], "scan_seconds": 0.0}
+    start = time.time()
+
+    def produce():
+        try:
+            stats["download"] = de.download_files(
+                urls, output_dir, test_mode, workers=download_workers,
+                on_complete=lambda filename, path, digest: files.put((path, filename, digest)))
+        except BaseException as e:
+            stats["download_error"] = e
+        finally:
+            stats["download_done"] = time.time() - start
+            files.put(DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    seen = set()
+    downloads_done = False
+    # Spawned, not forked: the downloader threads are running by now
+    with ProcessPoolExecutor(scan_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        running = set()
+        while not downloads_done or running:
+            # Take a file only while a scanner is free; otherwise the queue
+            # fills and holds back the downloader
+            while not downloads_done and len(running) < scan_workers:
+                item = files.get()
+                if item is DONE:
+                    downloads_done = True
+                elif item[1] not in seen:
+                    seen.add(item[1])
+                    running.add(pool.submit(scan_into_cache, *item))
+            if not running:
+                continue
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                filename, seconds, scanned, error = future.result()
+                stats["scanned" if scanned else "cached"] += 1
+                stats["scan_seconds"] += seconds
+                if error:
+                    stats["scan_errors"].append((filename, error))
+    stats["scan_done"] = time.time() - start
+
+    producer.join()
+    if "download_error" in stats:
+        raise stats["download_error"]
+    return stats
+
+
+def main():
+    uncached = [flag for flag in UNCACHED_FLAGS if flag in sys.argv]
+    if uncached:
+        print(f"{', '.join(uncached)}: scan results would not be cached, so every file "
+              f"would be parsed twice. Run download_estimates.py and "
+              f"extract_estimates.py separately instead.")
+        sys.exit(1)
+
+    urls, skipped, source = de.load_urls()
+    print(f"Read URLs from: {source}{' (newest first)' if de.NEWEST_FIRST else ''}")
+    print(f"Found {len(urls)} xlsx URLs, {len(skipped)} non-xlsx skipped")
+    print(f"\nIngesting to: {ee.INPUT_DIR} ({DOWNLOAD_WORKERS} download workers, "
+          f"{SCAN_WORKERS} scan workers, queue {QUEUE_SIZE})")
+
+    stats = ingest(urls, ee.INPUT_DIR, test_mode=de.TEST_MODE)
+    downloaded, failures, already_exists, duplicates = stats["download"]
+
+    print(f"\n--- PIPELINE ---")
+    print(f"Downloaded: {downloaded} ({already_exists} already existed, "
+          f"{len(duplicates)} hard-linked, {len(failures)} failed) "
+          f"in {stats['download_done']:.1f}s")
+    for fn, err in failures:
+        print(f"  {fn}: {err}")
+    print(f"Scanned: {stats['scanned']} ({stats['cached']} already cached, "
+          f"{len(stats['scan_errors'])} errors, {stats['scan_seconds']:.1f}s of scan time) "
+          f"done at {stats['scan_done']:.1f}s")
+
+    print(f"\n--- EXTRACT ---")
+    ee.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,29 @@
 #!/usr/bin/env python3
-"""Join scan results to Project List, creating enriched_master_index.json and join_report.json."""
+"""Join scan results to Project List, creating enriched_master_index.json and join_report.json.
+
+Pass --jsonl to read scan_results.jsonl lazily and write one enriched record
+per line to enriched_master_index.jsonl as it is joined.
+"""
 
 import json
 import os
+import sys
 from collections import defaultdict
 
+from scan_results_io import iter_scan_results
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SCAN_RESULTS = os.path.join(PROJECT_ROOT, "scan_results.json")
+SCAN_RESULTS_JSONL = os.path.join(PROJECT_ROOT, "scan_results.jsonl")
 PROJECT_LIST = os.path.join(PROJECT_ROOT, "project_list_parsed.json")
 OUTPUT_INDEX = os.path.join(PROJECT_ROOT, "enriched_master_index.json")
+OUTPUT_INDEX_JSONL = os.path.join(PROJECT_ROOT, "enriched_master_index.jsonl")
 OUTPUT_REPORT = os.path.join(PROJECT_ROOT, "join_report.json")
 
+JSONL = "--jsonl" in sys.argv
 
-def main():
-    with open(SCAN_RESULTS) as f:
-        scan_data = json.load(f)
 
+def main():
     with open(PROJECT_LIST) as f:
         pl_data = json.load(f)
 
@@ -26,54 +34,64 @@ def main():
         if fn:
             pl_by_filename[fn].append(record)
 
-    # Build lookup from scan results by filename
-    scan_by_filename = {}
-    for result in scan_data["results"]:
-        fn = result.get("filename")
-        if fn:
-            scan_by_filename[fn] = result
+    # Enriched records are collected for one JSON dump, or streamed in --jsonl mode
+    enriched = []
+    index_out = open(OUTPUT_INDEX_JSONL, "w") if JSONL else None
+    enriched_count = 0
+    matched_count = 0
+
+    def emit(record):
+        nonlocal enriched_count
+        enriched_count += 1
+        if index_out:
+            index_out.write(json.dumps(record, default=str) + "\n")
+        else:
+            enriched.append(record)
 
     # Join
-    enriched = []
-    matched_filenames = set()
+    scanned_filenames = set()
     scan_only = []
     list_only = []
 
     # For each scanned file, try to match to Project List
-    for fn, scan_result in scan_by_filename.items():
+    for scan_result in iter_scan_results(SCAN_RESULTS_JSONL if JSONL else SCAN_RESULTS):
+        fn = scan_result.get("filename")
+        if not fn:
+            continue
+        scanned_filenames.add(fn)
         pl_records = pl_by_filename.get(fn, [])
         if pl_records:
             # Use first matching PL record (they might be duplicates)
             pl_record = pl_records[0]
             merged = {**pl_record, **scan_result}
             merged["join_status"] = "matched"
-            enriched.append(merged)
-            matched_filenames.add(fn)
+            emit(merged)
+            matched_count += 1
         else:
             # Scan-only: file exists but not in Project List
             merged = {**scan_result}
             merged["join_status"] = "scan_only"
-            enriched.append(merged)
+            emit(merged)
             scan_only.append(fn)
 
     # Find list-only entries (in PL but not scanned)
     for fn, records in pl_by_filename.items():
-        if fn not in scan_by_filename:
+        if fn not in scanned_filenames:
             for record in records:
                 merged = {**record}
                 merged["join_status"] = "list_only"
-                enriched.append(merged)
+                emit(merged)
                 list_only.append(fn)
 
     # Find duplicates
     duplicate_filenames = {fn: len(records) for fn, records in pl_by_filename.items() if len(records) > 1}
 
-    # Count matched
-    matched_count = sum(1 for r in enriched if r.get("join_status") == "matched")
-
     # Write enriched index
-    with open(OUTPUT_INDEX, "w") as f:
-        json.dump(enriched, f, indent=2, default=str)
+    if index_out:
+        index_out.close()
+    else:
+        with open(OUTPUT_INDEX, "w") as f:
+            json.dump(enriched, f, indent=2, default=str)
 
     # Write join report
     report = {
@@ -82,7 +100,7 @@ def main():
         "list_only": len(set(list_only)),
         "duplicate_filenames": duplicate_filenames,
         "duplicate_count": len(duplicate_filenames),
-        "total_enriched_records": len(enriched),
+        "total_enriched_records": enriched_count,
         "scan_only_files": sorted(scan_only)[:20],
         "list_only_files": sorted(set(list_only))[:20],
     }
@@ -95,9 +113,9 @@ def main():
     print(f"Scan-only: {len(scan_only)} (files scanned but not in Project List)")
     print(f"List-only: {len(set(list_only))} (in Project List but not scanned)")
     print(f"Duplicate filenames in PL: {len(duplicate_filenames)}")
-    print(f"Total enriched records: {len(enriched)}")
+    print(f"Total enriched records: {enriched_count}")
     print(f"\nOutputs:")
-    print(f"  {OUTPUT_INDEX}")
+    print(f"  {OUTPUT_INDEX_JSONL if JSONL else OUTPUT_INDEX}")
     print(f"  {OUTPUT_REPORT}")
 
 
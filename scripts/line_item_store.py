@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Typed columnar store for estimate line items (written by extract_estimates.py).
+
+A store is a directory holding one flat binary file per column plus
+schema.json:
+
+    line_items/
+        schema.json          row count, byte order, column names and types
+        filename.i32         dictionary codes (int32, -1 = missing)
+        filename.dict.json   code -> string
+        qty.f64              float64 values, NaN = missing
+        ...
+
+Items come from every client tab, superseded version tabs included, so a
+workbook revised three times holds its items three times. is_main_tab is 1
+for rows from the tab extract_estimates.py picked as the workbook's
+main_tab and 0 otherwise; filter on it for one set of items per workbook.
+
+Numeric columns are raw float64/int32 arrays, so they can be memory-mapped
+and filtered without parsing, e.g. numpy.memmap(path, dtype="<f8") or, with
+the stdlib only, read_column() below. Text columns are dictionary-encoded:
+filter on the int32 codes, then decode the matches.
+
+Usage:
+    python scripts/line_item_store.py [STORE_DIR]
+
+prints the schema and per-section item counts and bid totals for main tabs.
+"""
+
+import json
+import math
+import mmap
+import os
+import shutil
+import sys
+from array import array
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(PROJECT_ROOT, "line_items")
+
+SCHEMA_VERSION = 2
+
+# (column, type): "str" columns are dictionary-encoded int32 codes,
+# "i32"/"f64" are stored as is. extract_estimates.py emits item rows in
+# this order, minus the leading filename and the trailing is_main_tab
+# which the writer adds.
+COLUMNS = [
+    ("filename", "str"),
+    ("tab", "str"),
+    ("section", "str"),
+    ("row", "i32"),
+    ("name", "str"),
+    ("gl_code", "str"),
+    ("qty", "f64"),        # C
+    ("unit_rate", "f64"),  # E
+    ("bid_total", "f64"),  # H
+    ("cost_rate", "f64"),  # M
+    ("recap_t", "f64"),    # T-Z: recap block
+    ("recap_u", "f64"),
+    ("recap_v", "f64"),
+    ("recap_w", "f64"),
+    ("recap_x", "f64"),
+    ("recap_y", "f64"),
+    ("recap_z", "f64"),
+    ("is_main_tab", "i32"),  # 1 if tab is the workbook's main_tab, else 0
+]
+
+TYPECODES = {"str": "i", "i32": "i", "f64": "d"}
+EXTENSIONS = {"str": ".i32", "i32": ".i32", "f64": ".f64"}
+MISSING_CODE = -1
+
+
+class LineItemWriter:
+    """Accumulate item rows in typed arrays and write them as a store on close().
+
+    The store is written to a temporary directory and swapped in, so readers
+    never see a half-written one.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.columns = {name: array(TYPECODES[kind]) for name, kind in COLUMNS}
+        self.dictionaries = {name: {} for name, kind in COLUMNS if kind == "str"}
+        self.rows = 0
+
+    def _encode(self, name, value):
+        if value is None:
+            return MISSING_CODE
+        codes = self.dictionaries[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, filename, items, main_tab=None):
+        """Append the item rows extract_estimates.py produced for filename.
+
+        main_tab is the result's main_tab; rows from that tab get is_main_tab 1.
+        """
+        for item in items:
+            for (name, kind), value in zip(COLUMNS, (filename, *item, int(item[0] == main_tab))):
+                if kind == "str":
+                    value = self._encode(name, value)
+                elif kind == "f64" and value is None:
+                    value = math.nan
+                self.columns[name].append(value)
+            self.rows += 1
+
+    def close(self):
+        tmp_dir = self.store_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        schema_columns = []
+        for name, kind in COLUMNS:
+            data_file = name + EXTENSIONS[kind]
+            with open(os.path.join(tmp_dir, data_file), "wb") as f:
+                self.columns[name].tofile(f)
+            column = {"name": name, "type": kind, "file": data_file}
+            if kind == "str":
+                column["dictionary"] = name + ".dict.json"
+                with open(os.path.join(tmp_dir, column["dictionary"]), "w") as f:
+                    json.dump(list(self.dictionaries[name]), f)
+            schema_columns.append(column)
+        schema = {
+            "version": SCHEMA_VERSION,
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "missing_code": MISSING_CODE,
+            "columns": schema_columns,
+        }
+        with open(os.path.join(tmp_dir, "schema.json"), "w") as f:
+            json.dump(schema, f, indent=2)
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.store_dir)
+
+
+def read_schema(store_dir=STORE_DIR):
+    with open(os.path.join(store_dir, "schema.json")) as f:
+        return json.load(f)
+
+
+def read_column(store_dir, name):
+    """Memory-map one column: a memoryview of float64 ("d") or int32 ("i") values.
+
+    The mapping stays valid while the memoryview is referenced. Values are
+    in the byte order recorded in the schema (the writer's native order).
+    """
+    schema = read_schema(store_dir)
+    column = next(c for c in schema["columns"] if c["name"] == name)
+    if schema["byteorder"] != sys.byteorder:
+        raise ValueError(f"store is {schema['byteorder']}-endian; use numpy to byte-swap")
+    if not schema["rows"]:
+        return memoryview(array(TYPECODES[column["type"]]))
+    with open(os.path.join(store_dir, column["file"]), "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(TYPECODES[column["type"]])
+
+
+def read_dictionary(store_dir, name):
+    """code -> string list for a dictionary-encoded column."""
+    with open(os.path.join(store_dir, name + ".dict.json")) as f:
+        return json.load(f)
+
+
+def main():
+    store_dir = sys.argv[1] if len(sys.argv) > 1 else STORE_DIR
+    schema = read_schema(store_dir)
+    print(f"{store_dir}: {schema['rows']} line items, {len(schema['columns'])} columns")
+    for column in schema["columns"]:
+        print(f"  {column['name']:12s} {column['type']}")
+
+    sections = read_dictionary(store_dir, "section")
+    section_codes = read_column(store_dir, "section")
+    bid_totals = read_column(store_dir, "bid_total")
+    main_tab = read_column(store_dir, "is_main_tab")
+    counts = defaultdict(int)
+    totals = defaultdict(float)
+    for code, bid, is_main in zip(section_codes, bid_totals, main_tab):
+        if not is_main:
+            continue  # superseded or other client tabs
+        counts[code] += 1
+        if bid == bid:  # skip NaN
+            totals[code] += bid
+    print(f"\nMain tabs only ({sum(counts.values())} items):")
+    print(f"{'section':30s} {'items':>8s} {'bid total':>16s}")
+    for code in sorted(counts, key=lambda c: -totals[c]):
+        print(f"{sections[code]:30s} {counts[code]:8d} {totals[code]:16,.2f}")
+
+
+if __name__ == "__main__":
+    main()
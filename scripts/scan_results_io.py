@@ -0,0 +1,41 @@
+"""Readers for the pipeline's JSON and JSONL outputs.
+
+scan_results.json/.jsonl (written by extract_estimates.py) and
+enriched_master_index.json/.jsonl (written by join_data.py) each come as
+one JSON document or as one record per line. These readers yield records
+either way, reading .jsonl lazily. Only the standard library is used, so
+downstream scripts can import this without pulling in the extractor.
+"""
+
+import json
+
+
+def iter_jsonl(path):
+    """Yield the record on each non-blank line of a .jsonl file."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_scan_results(path):
+    """Yield scan results from scan_results.json, or one line at a time from .jsonl.
+
+    The JSONL summary trailer ({"record": "summary", ...}) is skipped.
+    """
+    if not path.endswith(".jsonl"):
+        with open(path) as f:
+            yield from json.load(f)["results"]
+        return
+    for record in iter_jsonl(path):
+        if record.get("record") != "summary":
+            yield record
+
+
+def iter_enriched(path):
+    """Yield enriched records from the .json index, or one line at a time from .jsonl."""
+    if not path.endswith(".jsonl"):
+        with open(path) as f:
+            yield from json.load(f)
+        return
+    yield from iter_jsonl(path)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Generate synthetic estimate workbooks for benchmarking extract_estimates.py.
+
+Workbooks follow the layouts extract_estimates.py recognizes, cycling
+through FORMAT_A (Overview + Templates tabs, GL codes in column A,
+K4:Z5 header block), FORMAT_B (Revenue / Net Rev P&L rows in O:P) and
+FORMAT_UNKNOWN (neither). Each client tab has section blocks with line
+items, TOTAL rows and a GRAND TOTAL, optional recap values in columns T
+onward, and optional filler rows past the GRAND TOTAL. Some client tabs
+share a dated name prefix so they register as version tabs.
+
+Usage:
+    python scripts/synth_workbooks.py OUT_DIR [--files N] [--tabs N]
+        [--sections N] [--rows N] [--tail-rows N] [--versions N]
+        [--recap-cols N] [--seed N]
+
+Output is deterministic for a given spec and seed.
+"""
+
+import os
+import random
+import sys
+
+import openpyxl
+
+FORMATS = ("FORMAT_A", "FORMAT_B", "FORMAT_UNKNOWN")
+
+DEFAULT_SPEC = {
+    "files": 30,           # workbooks, cycling through FORMATS
+    "tabs": 2,             # client tabs per workbook
+    "sections": 5,         # section blocks per client tab
+    "rows": 8,             # line items per section
+    "tail_rows": 0,        # filler rows below GRAND TOTAL
+    "versions": 2,         # client tabs sharing a dated name prefix
+    "recap_cols": 3,       # recap columns filled per line item, from T
+    "seed": 1,
+}
+
+# Display-case headers as they appear in real estimates; labor comes first
+# so every tab with sections has labor roles to extract.
+SECTIONS = [
+    "ONSITE LABOR ACTIVITY",
+    "Planning & Administration",
+    "Travel Expenses & Fees",
+    "Production Expenses",
+    "Logistics Expenses",
+    "Creative Costs",
+    "Venue Access & Fees",
+    "Agency Fees",
+    "Misc Expenses",
+    "Other",
+]
+
+ROLES = ["Event Manager", "Brand Ambassador (/hr)", "Driver OT >10 hrs", "Product Specialist",
+         "Lead Tech", "Field Marketer", "Photographer"]
+
+RECAP_COL = 20   # T
+LAST_COL = 26    # Z
+
+
+def tab_names(count, versions):
+    """Client tab names; the first versions of them share a dated prefix."""
+    names = []
+    for i in range(count):
+        if i < versions:
+            names.append(f"Client Event {i + 1}.{10 + i}.24")
+        else:
+            # Distinct leading letters keep the other tabs out of version groups
+            names.append(f"{chr(ord('A') + i % 26)}{i // 26 or ''} Market")
+    return names
+
+
+def header_rows(fmt, rng, scale):
+    """Rows 1-9: title plus the financial header block each format reads."""
+    rows = [[None] * LAST_COL for _ in range(9)]
+    rows[0][1] = "EVENT ESTIMATE"
+    if fmt == "FORMAT_A":
+        rows[3][10:14] = [round(rng.uniform(5e4, 5e5) * scale, 2), rng.randint(1000, 50000),
+                          round(rng.uniform(0.1, 0.4), 3), rng.randint(0, 5000)]
+        rows[4][10] = round(rng.uniform(4e4, 4e5) * scale, 2)
+        rows[3][23:26] = [round(rng.uniform(5e4, 5e5), 2), rng.randint(1000, 50000),
+                          round(rng.uniform(0.1, 0.4), 3)]
+        rows[4][23] = round(rng.uniform(4e4, 4e5), 2)
+    elif fmt == "FORMAT_B":
+        rows[3][14:16] = ["Revenue", round(rng.uniform(5e4, 5e5) * scale, 2)]
+        rows[4][14:16] = ["Net Rev", round(rng.uniform(4e4, 4e5) * scale, 2)]
+        rows[6][14:16] = ["GM", round(rng.uniform(0.1, 0.4), 3)]
+    return rows
+
+
+def client_tab_rows(fmt, spec, rng, scale):
+    """All rows of one client tab, as lists of cell values."""
+    rows = header_rows(fmt, rng, scale)
+    grand_total = 0
+    for s in range(spec["sections"]):
+        rows.append([None, SECTIONS[s % len(SECTIONS)]])
+        section_total = 0
+        for i in range(spec["rows"]):
+            row = [None] * (RECAP_COL - 1 + spec["recap_cols"])
+            if fmt == "FORMAT_A":
+                row[0] = 4000 + rng.randint(1, 99) / 100
+            row[1] = f"{rng.choice(ROLES)} {i + 1}"
+            row[2] = rng.randint(1, 5)
+            row[3] = rng.randint(1, 10)
+            row[4] = rng.choice([25.5, 40, 65, 120, "$1,200.00"])
+            row[7] = rng.randint(100, 5000)
+            row[12] = rng.choice([0.3, 0.45, None])
+            for c in range(spec["recap_cols"]):
+                row[RECAP_COL - 1 + c] = rng.randint(0, 3000)
+            section_total += row[7]
+            rows.append(row)
+        total_row = [None] * 8
+        total_row[1] = f"TOTAL {SECTIONS[s % len(SECTIONS)].upper()}"
+        total_row[7] = section_total
+        rows.append(total_row)
+        rows.append([])
+        grand_total += section_total
+    rows.append([None, "GRAND TOTAL", None, None, None, None, None, round(grand_total * scale, 2)])
+    for i in range(spec["tail_rows"]):
+        rows.append([None, None, f"note {i + 1}", rng.randint(0, 100)])
+    return rows
+
+
+def write_workbook(path, fmt, spec, rng):
+    """Write one synthetic workbook of format fmt to path."""
+    wb = openpyxl.Workbook(write_only=True)
+    if fmt == "FORMAT_A":
+        wb.create_sheet("Overview").append(["Overview"])
+        wb.create_sheet("Templates").append(["Templates"])
+    for name in tab_names(spec["tabs"], spec["versions"]):
+        ws = wb.create_sheet(name)
+        for row in client_tab_rows(fmt, spec, rng, scale=rng.uniform(0.5, 2.0)):
+            ws.append(row)
+    if fmt == "FORMAT_A":
+        ws = wb.create_sheet("ROS")
+        for i in range(1, 100):
+            ws.append([f"{i:02d}:00", "Run of show item"])
+    elif fmt == "FORMAT_B":
+        wb.create_sheet("Labor Log").append(["Name", "Hours"])
+    wb.save(path)
+
+
+def generate_corpus(out_dir, spec=None):
+    """Write spec["files"] workbooks to out_dir; return [(path, expected_format)]."""
+    spec = {**DEFAULT_SPEC, **(spec or {})}
+    rng = random.Random(spec["seed"])
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for n in range(spec["files"]):
+        fmt = FORMATS[n % len(FORMATS)]
+        path = os.path.join(out_dir, f"synth_{n:04d}_{fmt.lower()}.xlsx")
+        write_workbook(path, fmt, spec, rng)
+        corpus.append((path, fmt))
+    return corpus
+
+
+def spec_from_args(argv):
+    """DEFAULT_SPEC overridden by --files/--tabs/... N flags in argv."""
+    spec = dict(DEFAULT_SPEC)
+    for key in spec:
+        flag = "--" + key.replace("_", "-")
+        if flag in argv:
+            spec[key] = int(argv[argv.index(flag) + 1])
+    return spec
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1].startswith("--"):
+        print(__doc__)
+        sys.exit(1)
+    spec = spec_from_args(sys.argv)
+    corpus = generate_corpus(sys.argv[1], spec)
+    print(f"Wrote {len(corpus)} workbooks to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()